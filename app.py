@@ -7,10 +7,14 @@ Provides web UI and API endpoints for policy Q&A.
 import os
 import time
 import logging
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, g
 from dotenv import load_dotenv
 
 from src.rag import RAGSystem, QueryValidator
+from src.metrics import REGISTRY
+from src.profiling import RequestProfiler
+from src.admission import AdmissionController, AdmissionRejected
+from src.querylog import QueryLog, query_record
 
 # Load environment variables
 load_dotenv()
@@ -25,12 +29,44 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-pro
 
 # Initialize RAG system
 try:
-    rag_system = RAGSystem()
+    # Under gunicorn (RAG_PREFORK=1) Chroma is opened per worker after fork
+    rag_system = RAGSystem(defer_connect=os.getenv('RAG_PREFORK') == '1')
     logger.info("RAG system initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize RAG system: {e}")
     rag_system = None
 
+# Per-request profiling, off unless RAG_ADMIN_TOKEN or RAG_PROFILE_SAMPLE_EVERY is set
+profiler = RequestProfiler.from_env()
+
+# Structured JSONL log of answered questions, off unless RAG_QUERY_LOG is set
+query_log = QueryLog.from_env()
+
+# Bound concurrent queries and waiting requests so overload fails fast with 503
+admission = AdmissionController(
+    max_concurrent=int(os.getenv('RAG_MAX_CONCURRENT', '8')),
+    max_queue=int(os.getenv('RAG_MAX_QUEUE', '32')),
+    max_wait_s=float(os.getenv('RAG_MAX_QUEUE_WAIT_S', '10'))
+)
+
+CHAT_REQUESTS = REGISTRY.counter('rag_chat_requests_total', 'Chat requests by HTTP status', ('status',))
+CHAT_DURATION = REGISTRY.histogram('rag_chat_request_duration_seconds', 'End-to-end /chat request latency')
+
+
+@app.before_request
+def start_request_timer():
+    """Record request start time for /chat latency metrics."""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record /chat request count and latency."""
+    if request.path == '/chat':
+        CHAT_REQUESTS.inc(status=response.status_code)
+        CHAT_DURATION.observe(time.perf_counter() - g.request_start)
+    return response
+
 
 @app.route('/')
 def index():
@@ -86,6 +122,9 @@ def chat():
                 'sources': []
             }), 400
         
+        # Per-stage timings are only returned when explicitly requested
+        include_timings = bool(data.get('include_timings')) or request.args.get('timings') == '1'
+        
         # Validate and preprocess question
         question = QueryValidator.preprocess_question(question)
         
@@ -93,15 +132,41 @@ def chat():
         start_time = time.time()
         
         # Process question with RAG system
-        result = rag_system.query(question)
+        profile_file = None
+        try:
+            with admission.admit():
+                if profiler.enabled and profiler.should_profile(request.headers):
+                    result, profile_file = profiler.run(rag_system.query, question)
+                else:
+                    result = rag_system.query(question)
+        except AdmissionRejected as e:
+            response = jsonify({
+                'error': 'Server busy',
+                'answer': 'The system is handling too many questions right now. Please try again shortly.',
+                'citations': [],
+                'sources': []
+            })
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
         
         # Calculate latency
         latency_ms = int((time.time() - start_time) * 1000)
         result['latency_ms'] = latency_ms
         
+        timings = result.pop('timings_ms', None)
+        if include_timings:
+            result['timings_ms'] = timings
+        retrieved = result.pop('retrieved', None)
+        
         logger.info(f"Processed query in {latency_ms}ms: {question[:50]}...")
+        if query_log:
+            query_log.record(query_record(question, result, timings, retrieved, rag_system.llm_model,
+                                          latency_ms, rag_system.answer_cache is not None))
         
-        return jsonify(result)
+        response = jsonify(result)
+        if profile_file:
+            response.headers['X-Profile-File'] = profile_file
+        return response
         
     except Exception as e:
         logger.error(f"Error processing chat request: {e}")
@@ -149,9 +214,11 @@ def stats():
         
         return jsonify({
             'total_documents': collection_count,
-            'collection_name': 'company_policies',
+            'collection_name': rag_system.collection.name,
             'embedding_model': 'all-MiniLM-L6-v2',
-            'llm_model': rag_system.llm_model
+            'llm_model': rag_system.llm_model,
+            'admission': admission.stats(),
+            'caches': rag_system.cache_stats()
         })
         
     except Exception as e:
@@ -159,6 +226,12 @@ def stats():
         return jsonify({'error': 'Failed to get statistics'}), 500
 
 
+@app.route('/metrics')
+def metrics():
+    """Expose metrics in Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
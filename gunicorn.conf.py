@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration for production pre-fork serving.
+
+    gunicorn -c gunicorn.conf.py
+
+The app (and with it the SentenceTransformer weights) is loaded once in the
+master and shared with forked workers copy-on-write. Chroma's client is not
+fork-safe, so each worker opens its own connection after fork, and caps torch
+threads so workers don't oversubscribe cores.
+"""
+
+import gc
+import os
+import sys
+
+wsgi_app = "app:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Load app.py (RAGSystem, SentenceTransformer weights) in the master before forking
+preload_app = True
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# LLM calls can take up to 30 s, leave headroom before the worker is killed
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+
+
+def torch_threads_per_worker() -> int:
+    """Torch intra-op threads for each worker, defaults to an even share of the cores."""
+    configured = os.getenv("RAG_TORCH_THREADS")
+    if configured:
+        return int(configured)
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+# Applied before app.py imports torch in the master; HF tokenizers must not spawn threads pre-fork
+os.environ.setdefault("OMP_NUM_THREADS", str(torch_threads_per_worker()))
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+# Tells app.py to skip opening Chroma in the master (its client is not fork-safe)
+os.environ["RAG_PREFORK"] = "1"
+
+
+def when_ready(server):
+    """Move everything loaded so far out of GC tracking so workers don't dirty shared pages."""
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} objects before forking {workers} workers")
+
+
+def post_fork(server, worker):
+    """Per-worker setup: thread limits and this worker's own Chroma connection."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads_per_worker())
+    except ImportError:
+        pass
+
+    app_module = sys.modules.get("app")
+    rag_system = getattr(app_module, "rag_system", None)
+    if rag_system is not None:
+        rag_system.connect()
+
+    server.log.info(f"Worker {worker.pid} ready (torch threads: {torch_threads_per_worker()})")
@@ -28,6 +28,19 @@ def main():
     tests = [
         "test_installation.py",
         "test_openrouter.py",
+        "test_fake_openrouter.py",
+        "test_cassette.py",
+        "test_snapshot.py",
+        "test_batching.py",
+        "test_admission.py",
+        "test_ratelimit.py",
+        "test_aliases.py",
+        "test_shards.py",
+        "test_small_to_big.py",
+        "test_adaptive_depth.py",
+        "test_extractive.py",
+        "test_cache.py",
+        "test_querylog.py",
         "test_links.py",
         "test_full_system.py"
     ]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark serving modes: the single-process Flask server vs gunicorn pre-fork workers.
+Runs each mode against the local fake LLM and reports throughput, latency and
+RSS/PSS per process (PSS shows how much of the model is actually shared).
+
+Linux only (reads /proc). Example:
+    python scripts/bench_serving.py --workers 1 2 4 --rps 20 --duration 20
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from pathlib import Path
+from typing import List, Dict, Any
+
+import requests
+
+# Add parent directory to path for imports
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.fake_openrouter import FakeLLMBehavior, start_in_thread
+from load_test import DEFAULT_QUESTIONS, run_load_test
+
+
+def process_tree(pid: int) -> List[int]:
+    """Return pid and all of its descendants."""
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        children = (task / "children").read_text().split()
+        for child in children:
+            pids.extend(process_tree(int(child)))
+    return pids
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """Read Rss and Pss for a process from /proc/<pid>/smaps_rollup."""
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        parts = line.split()
+        if parts[0] in ('Rss:', 'Pss:'):
+            values[parts[0].rstrip(':').lower()] = int(parts[1])
+    return values
+
+
+def wait_until_ready(url: str, timeout: float = 180.0):
+    """Poll the stats endpoint until the server answers."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server did not become ready: {url}")
+
+
+def benchmark_mode(name: str, command: List[str], env: Dict[str, str], port: int,
+                   rps: float, duration: float) -> Dict[str, Any]:
+    """Start a server, load it, sample memory and stop it."""
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(f"{base_url}/api/stats")
+
+        report = run_load_test(f"{base_url}/chat", DEFAULT_QUESTIONS, rps, duration)
+
+        # Sample memory after load so lazily touched pages are counted
+        processes = {pid: memory_kb(pid) for pid in process_tree(process.pid)}
+        return {
+            'mode': name,
+            'throughput_rps': report['throughput_rps'],
+            'error_rate': report['error_rate'],
+            'latency_ms': report['latency_ms'],
+            'processes': len(processes),
+            'rss_mb_per_process': {pid: mem['rss'] / 1024 for pid, mem in processes.items()},
+            'total_rss_mb': sum(mem['rss'] for mem in processes.values()) / 1024,
+            'total_pss_mb': sum(mem['pss'] for mem in processes.values()) / 1024
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def main():
+    """Run serving benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark single-process vs pre-fork serving')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4], help='Gunicorn worker counts to test')
+    parser.add_argument('--rps', type=float, default=20.0, help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=20.0, help='Load duration per mode in seconds')
+    parser.add_argument('--llm-latency-ms', type=float, default=200.0, help='Fake LLM latency')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the server under test')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+
+    args = parser.parse_args()
+
+    server, llm_url = start_in_thread(FakeLLMBehavior(latency_ms=args.llm_latency_ms))
+    # No client-side rate limit: the benchmark measures the server, not the OpenRouter budget
+    env = dict(os.environ, OPENROUTER_BASE_URL=llm_url, OPENROUTER_API_KEY='fake', OPENROUTER_RATE_LIMIT_RPM='0',
+               PORT=str(args.port), FLASK_DEBUG='False')
+
+    modes = [('single-process', [sys.executable, 'app.py'], env)]
+    for workers in args.workers:
+        modes.append((f"gunicorn-{workers}w", [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                      dict(env, WEB_CONCURRENCY=str(workers))))
+
+    results = []
+    for name, command, mode_env in modes:
+        print(f"Benchmarking {name}...")
+        results.append(benchmark_mode(name, command, mode_env, args.port, args.rps, args.duration))
+
+    server.shutdown()
+
+    print("\nSERVING BENCHMARK")
+    print("=" * 78)
+    print(f"{'Mode':<18}{'RPS':>8}{'p50 ms':>10}{'p99 ms':>10}{'Procs':>7}{'RSS MB':>10}{'PSS MB':>10}{'RSS/proc':>10}")
+    for r in results:
+        print(f"{r['mode']:<18}{r['throughput_rps']:>8.1f}{r['latency_ms']['p50']:>10.1f}"
+              f"{r['latency_ms']['p99']:>10.1f}{r['processes']:>7}{r['total_rss_mb']:>10.1f}"
+              f"{r['total_pss_mb']:>10.1f}{r['total_rss_mb'] / r['processes']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
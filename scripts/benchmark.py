@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Latency regression benchmarks for the RAG pipeline.
+Times chunking, ingestion embedding, query encoding, Chroma top-k retrieval and
+end-to-end /chat against the local fake LLM, writes the results to JSON and
+compares them with a saved baseline.
+
+Examples:
+    python scripts/benchmark.py run --output benchmarks/baseline.json
+    python scripts/benchmark.py run --baseline benchmarks/baseline.json --tolerance 0.2
+    python scripts/benchmark.py compare benchmarks/baseline.json benchmarks/results.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+# Add parent directory to path for imports
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.latency import summarize_latencies
+from load_test import DEFAULT_QUESTIONS
+
+CASES = ('chunking', 'ingest_embed', 'query_encode', 'retrieval', 'chat_e2e')
+
+# Latency statistics checked by compare
+COMPARED_STATS = ('p50', 'p95')
+
+
+def time_iterations(func: Callable[[int], Any], iterations: int, warmup: int) -> List[float]:
+    """Call func(i) warmup + iterations times and return the timed latencies in ms."""
+    for i in range(warmup):
+        func(i)
+
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+class BenchmarkSuite:
+    """Builds shared fixtures lazily and runs the benchmark cases."""
+
+    def __init__(self, corpus: str = "policies", persist_dir: str = "./chroma_db",
+                 embedding_model: str = "all-MiniLM-L6-v2", top_k: int = 5,
+                 iterations: int = 20, warmup: int = 3, llm_latency_ms: float = 0.0):
+        """Initialize suite.
+
+        Args:
+            corpus: Documents used for the chunking and embedding cases
+            persist_dir: Chroma index used for retrieval and /chat
+            embedding_model: Sentence transformer model name
+            top_k: Chunks retrieved per query
+            iterations: Timed iterations per case
+            warmup: Untimed iterations run first
+            llm_latency_ms: Fixed fake LLM latency for /chat (0 measures only our overhead)
+        """
+        self.corpus = Path(corpus)
+        self.persist_dir = persist_dir
+        self.embedding_model = embedding_model
+        self.top_k = top_k
+        self.iterations = iterations
+        self.warmup = warmup
+        self.llm_latency_ms = llm_latency_ms
+
+        self._documents = None
+        self._chunks = None
+        self._model = None
+        self._rag_system = None
+        self._llm_server = None
+
+    def run(self, cases: List[str]) -> Dict[str, Any]:
+        """Run the selected cases and return the results document."""
+        results = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'config': {
+                'iterations': self.iterations,
+                'warmup': self.warmup,
+                'top_k': self.top_k,
+                'embedding_model': self.embedding_model,
+                'llm_latency_ms': self.llm_latency_ms
+            },
+            'cases': {}
+        }
+
+        try:
+            for case in cases:
+                print(f"Running {case}...")
+                results['cases'][case] = getattr(self, f"bench_{case}")()
+        finally:
+            if self._llm_server is not None:
+                self._llm_server.shutdown()
+
+        return results
+
+    def bench_chunking(self) -> Dict[str, Any]:
+        """Chunk the whole corpus."""
+        from src.ingest import TextChunker
+
+        chunker = TextChunker()
+        documents = self.documents()
+        total_chars = sum(len(document['content']) for document in documents)
+
+        latencies = time_iterations(
+            lambda i: [chunker.chunk_document(document) for document in documents],
+            self.iterations, self.warmup
+        )
+        return self._case_result(latencies, total_chars, 'chars/s')
+
+    def bench_ingest_embed(self) -> Dict[str, Any]:
+        """Embed every corpus chunk in batches, as ingestion does."""
+        texts = [chunk['text'] for chunk in self.chunks()]
+        model = self.model()
+
+        latencies = time_iterations(
+            lambda i: model.encode(texts, batch_size=32, show_progress_bar=False),
+            self.iterations, self.warmup
+        )
+        return self._case_result(latencies, len(texts), 'chunks/s')
+
+    def bench_query_encode(self) -> Dict[str, Any]:
+        """Encode one query."""
+        model = self.model()
+
+        latencies = time_iterations(
+            lambda i: model.encode(DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)]),
+            self.iterations, self.warmup
+        )
+        return self._case_result(latencies, 1, 'queries/s')
+
+    def bench_retrieval(self) -> Dict[str, Any]:
+        """Top-k Chroma query for a precomputed query embedding."""
+        collection = self.rag_system().collection
+        embeddings = self.model().encode(DEFAULT_QUESTIONS).tolist()
+
+        latencies = time_iterations(
+            lambda i: collection.query(
+                query_embeddings=[embeddings[i % len(embeddings)]],
+                n_results=self.top_k,
+                include=['documents', 'metadatas', 'distances']
+            ),
+            self.iterations, self.warmup
+        )
+        return self._case_result(latencies, 1, 'queries/s')
+
+    def bench_chat_e2e(self) -> Dict[str, Any]:
+        """POST /chat through the Flask app with the fake LLM behind it."""
+        rag_system = self.rag_system()
+        import app as app_module
+
+        app_module.rag_system = rag_system
+        client = app_module.app.test_client()
+
+        def chat(i):
+            response = client.post('/chat', json={'question': DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)]})
+            if response.status_code != 200:
+                raise RuntimeError(f"/chat returned {response.status_code}: {response.get_data(as_text=True)}")
+
+        latencies = time_iterations(chat, self.iterations, self.warmup)
+        return self._case_result(latencies, 1, 'requests/s')
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Parsed corpus documents."""
+        if self._documents is None:
+            from src.ingest import DocumentProcessor
+
+            processor = DocumentProcessor()
+            paths = sorted(p for p in self.corpus.rglob('*')
+                           if p.is_file() and p.suffix.lower() in processor.supported_extensions)
+            self._documents = [d for d in (processor.process_file(p) for p in paths) if d]
+        return self._documents
+
+    def chunks(self) -> List[Dict[str, Any]]:
+        """Corpus chunks with the default chunker settings."""
+        if self._chunks is None:
+            from src.ingest import TextChunker
+
+            chunker = TextChunker()
+            self._chunks = [chunk for document in self.documents() for chunk in chunker.chunk_document(document)]
+        return self._chunks
+
+    def model(self):
+        """Embedding model, shared with the RAG system once that exists."""
+        if self._model is None:
+            if self._rag_system is not None:
+                self._model = self._rag_system.embedder
+            else:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.embedding_model)
+        return self._model
+
+    def rag_system(self):
+        """RAG system wired to the fake LLM, without rate limiting, cassette or query micro-batching."""
+        if self._rag_system is None:
+            from src.fake_openrouter import FakeLLMBehavior, start_in_thread
+            from src.rag import RAGSystem
+
+            server, base_url = start_in_thread(FakeLLMBehavior(latency_ms=self.llm_latency_ms, seed=0))
+            self._llm_server = server
+            os.environ['OPENROUTER_API_KEY'] = os.getenv('OPENROUTER_API_KEY') or 'fake'
+            os.environ['OPENROUTER_RATE_LIMIT_RPM'] = '0'
+            os.environ['LLM_CASSETTE_MODE'] = 'off'
+            # The app builds its own system at import; deferring keeps it from opening Chroma
+            os.environ['RAG_PREFORK'] = '1'
+
+            self._rag_system = RAGSystem(
+                chroma_persist_dir=self.persist_dir,
+                embedding_model=self.embedding_model,
+                top_k=self.top_k,
+                openrouter_base_url=base_url,
+                embed_batch_window_ms=None
+            )
+            if self._model is None:
+                self._model = self._rag_system.embedder
+        return self._rag_system
+
+    def _case_result(self, latencies: List[float], items_per_iteration: int, unit: str) -> Dict[str, Any]:
+        """Latency summary plus throughput derived from the mean iteration time."""
+        summary = summarize_latencies(latencies)
+        return {
+            'iterations': len(latencies),
+            'latency_ms': summary,
+            'throughput': {
+                'value': items_per_iteration / (summary['mean'] / 1000) if summary['mean'] else 0.0,
+                'unit': unit
+            }
+        }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float,
+                    min_delta_ms: float) -> List[Dict[str, Any]]:
+    """Compare p50/p95 per case; a stat regresses when it is slower by more than
+    `tolerance` (fraction) and by more than `min_delta_ms`, which absorbs timer noise."""
+    rows = []
+    for case, base in baseline['cases'].items():
+        if case not in current['cases']:
+            rows.append({'case': case, 'stat': '-', 'status': 'missing'})
+            continue
+
+        for stat in COMPARED_STATS:
+            before = base['latency_ms'][stat]
+            after = current['cases'][case]['latency_ms'][stat]
+            change = (after - before) / before if before else 0.0
+            regressed = change > tolerance and after - before > min_delta_ms
+            rows.append({
+                'case': case,
+                'stat': stat,
+                'baseline_ms': before,
+                'current_ms': after,
+                'change': change,
+                'status': 'REGRESSED' if regressed else 'ok'
+            })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], tolerance: float):
+    """Print a comparison table."""
+    print(f"\nBENCHMARK COMPARISON (tolerance {tolerance:+.0%})")
+    print("=" * 72)
+    print(f"{'Case':<16}{'Stat':<6}{'Baseline ms':>14}{'Current ms':>14}{'Change':>10}  Status")
+    for row in rows:
+        if row['status'] == 'missing':
+            print(f"{row['case']:<16}{'-':<6}{'-':>14}{'-':>14}{'-':>10}  missing from current run")
+            continue
+        print(f"{row['case']:<16}{row['stat']:<6}{row['baseline_ms']:>14.2f}{row['current_ms']:>14.2f}"
+              f"{row['change']:>+10.1%}  {row['status']}")
+
+
+def print_results(results: Dict[str, Any]):
+    """Print a results table."""
+    print("\nBENCHMARK RESULTS")
+    print("=" * 72)
+    print(f"{'Case':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Throughput':>22}")
+    for case, result in results['cases'].items():
+        latency = result['latency_ms']
+        throughput = f"{result['throughput']['value']:.1f} {result['throughput']['unit']}"
+        print(f"{case:<16}{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}{throughput:>22}")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Load a results or baseline JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_regressions(baseline_path: str, current: Dict[str, Any], tolerance: float, min_delta_ms: float) -> int:
+    """Compare against a baseline file and return the process exit code."""
+    rows = compare_results(load_results(baseline_path), current, tolerance, min_delta_ms)
+    print_comparison(rows, tolerance)
+
+    regressions = [row for row in rows if row['status'] == 'REGRESSED']
+    if regressions:
+        print(f"\n✗ {len(regressions)} latency regression(s) beyond {tolerance:.0%}")
+        return 1
+    print("\n✓ No latency regressions")
+    return 0
+
+
+def main():
+    """Run or compare benchmarks."""
+    parser = argparse.ArgumentParser(description='Latency regression benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run benchmarks and write results JSON')
+    run_parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES), help='Cases to run')
+    run_parser.add_argument('--iterations', type=int, default=20, help='Timed iterations per case')
+    run_parser.add_argument('--warmup', type=int, default=3, help='Untimed warmup iterations per case')
+    run_parser.add_argument('--corpus', default='policies', help='Corpus for chunking and embedding cases')
+    run_parser.add_argument('--persist-dir', default=os.getenv('CHROMA_PERSIST_DIRECTORY', './chroma_db'),
+                            help='Chroma index for retrieval and /chat')
+    run_parser.add_argument('--top-k', type=int, default=5, help='Chunks retrieved per query')
+    run_parser.add_argument('--llm-latency-ms', type=float, default=0.0, help='Fake LLM latency for /chat')
+    run_parser.add_argument('--output', default='benchmarks/results.json', help='Where to write results')
+    run_parser.add_argument('--baseline', help='Compare with this baseline after running')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare results with a baseline')
+    compare_parser.add_argument('baseline', help='Baseline results JSON')
+    compare_parser.add_argument('current', help='Current results JSON')
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--tolerance', type=float, default=0.2,
+                         help='Allowed p50/p95 slowdown as a fraction (0.2 = 20%%)')
+        sub.add_argument('--min-delta-ms', type=float, default=1.0,
+                         help='Ignore slowdowns smaller than this many milliseconds')
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        sys.exit(check_regressions(args.baseline, load_results(args.current), args.tolerance, args.min_delta_ms))
+
+    suite = BenchmarkSuite(
+        corpus=args.corpus,
+        persist_dir=args.persist_dir,
+        top_k=args.top_k,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        llm_latency_ms=args.llm_latency_ms
+    )
+    results = suite.run(args.cases)
+    print_results(results)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        sys.exit(check_regressions(args.baseline, results, args.tolerance, args.min_delta_ms))
+
+
+if __name__ == "__main__":
+    main()
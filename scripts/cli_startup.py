@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start time of each CLI subcommand.
+Runs `python -m src.cli <command> --help` in a fresh interpreter several times and
+reports the median wall time next to a bare-interpreter baseline. Exits 1 when a
+light command exceeds the budget.
+
+Example:
+    python scripts/cli_startup.py --runs 5 --budget-ms 1000
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.cli import COMMANDS, LIGHT_COMMANDS
+
+
+def time_command(cmd, runs: int) -> float:
+    """Median wall time in ms of running cmd in a fresh process."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    """Time CLI startup."""
+    parser = argparse.ArgumentParser(description='Measure CLI subcommand cold-start time')
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS), help='Subcommands to time')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per command (median is reported)')
+    parser.add_argument('--budget-ms', type=float, default=1000.0,
+                        help='Maximum startup time for light commands')
+
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, '-c', 'pass'], args.runs)
+    print(f"{'command':<10}{'median ms':>11}{'over baseline':>15}")
+    print(f"{'(python)':<10}{baseline:>11.0f}{'':>15}")
+
+    over_budget = []
+    for command in args.commands:
+        elapsed = time_command([sys.executable, '-m', 'src.cli', command, '--help'], args.runs)
+        light = command in LIGHT_COMMANDS
+        flag = ''
+        if light and elapsed > args.budget_ms:
+            over_budget.append(command)
+            flag = '  OVER BUDGET'
+        print(f"{command:<10}{elapsed:>11.0f}{elapsed - baseline:>15.0f}{' (light)' if light else ''}{flag}")
+
+    if over_budget:
+        print(f"\nLight commands over {args.budget_ms:.0f}ms: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
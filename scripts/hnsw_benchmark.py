@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+HNSW index tuning benchmark.
+For each corpus size, builds a Chroma collection in a temporary directory for every
+M and construction_ef pair, then for each search ef measures recall@k against exact
+(brute-force) search and single-query latency. The report picks, per corpus size,
+the fastest setting that still meets the recall target.
+
+Vectors are synthetic unit-length embeddings drawn around random topic centres, the
+same shape as all-MiniLM-L6-v2 output, so corpus sizes far beyond the policy corpus
+can be tested without an embedding model.
+
+Example:
+    python scripts/hnsw_benchmark.py --sizes 1000 5000 20000 --m 8 16 32 --search-ef 10 20 50 100
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+import chromadb
+from chromadb.config import Settings
+from chromadb.api.client import SharedSystemClient
+
+# Add parent directory to path for imports
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.latency import summarize_latencies
+from src.ingest import HNSW_SPACES, hnsw_metadata
+
+INSERT_BATCH = 5000
+
+
+def make_vectors(size: int, queries: int, dim: int, seed: int):
+    """Clustered unit vectors for the corpus, and queries near random corpus points."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(8, size // 100), dim))
+    corpus = centres[rng.integers(len(centres), size=size)] + 0.6 * rng.normal(size=(size, dim))
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+
+    query_vectors = corpus[rng.integers(size, size=queries)] + 0.3 * rng.normal(size=(queries, dim))
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return corpus.astype(np.float32), query_vectors.astype(np.float32)
+
+
+def exact_search(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Ground-truth top-k row indices per query."""
+    dots = queries @ corpus.T
+    if space == 'l2':
+        distances = (corpus * corpus).sum(axis=1)[None, :] - 2.0 * dots
+    elif space == 'cosine':
+        distances = -dots / np.linalg.norm(corpus, axis=1)[None, :]
+    else:
+        distances = -dots
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(np.take_along_axis(distances, top, axis=1), axis=1), axis=1)
+
+
+def build_collection(client, name: str, corpus: np.ndarray, metadata: Dict[str, Any]):
+    """Create and fill a collection, returning it and the build time in seconds."""
+    start = time.perf_counter()
+    collection = client.create_collection(name=name, metadata=metadata)
+    ids = [str(i) for i in range(len(corpus))]
+    for offset in range(0, len(corpus), INSERT_BATCH):
+        collection.add(ids=ids[offset:offset + INSERT_BATCH],
+                       embeddings=corpus[offset:offset + INSERT_BATCH])
+    return collection, time.perf_counter() - start
+
+
+def open_client(path: str):
+    return chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+
+
+def open_with_search_ef(path: str, name: str, search_ef: int, warm_query: np.ndarray):
+    """Reopen a collection so its HNSW index is loaded with the given search ef.
+
+    Chroma reads ef_search when it loads an index into the process, so the cached
+    system is dropped after changing it, and the first query (the load) is not timed.
+    """
+    open_client(path).get_collection(name).modify(configuration={'hnsw': {'ef_search': search_ef}})
+    SharedSystemClient.clear_system_cache()
+
+    collection = open_client(path).get_collection(name)
+    collection.query(query_embeddings=[warm_query], n_results=1)
+    return collection
+
+
+def measure(collection, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, Any]:
+    """Recall@k against exact search and per-query latency."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, include=['distances'])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(int(i) for i in result['ids'][0]) & set(expected.tolist()))
+    return {'recall_at_k': hits / truth.size, 'latency_ms': summarize_latencies(latencies)}
+
+
+def run_benchmark(sizes: List[int], ms: List[int], construction_efs: List[int], search_efs: List[int],
+                  space: str, k: int, num_queries: int, dim: int, seed: int) -> List[Dict[str, Any]]:
+    """Measure every HNSW setting at every corpus size."""
+    path = tempfile.mkdtemp(prefix='hnsw_benchmark_')
+    rows = []
+    for size in sizes:
+        corpus, queries = make_vectors(size, num_queries, dim, seed)
+        truth = exact_search(corpus, queries, k, space)
+
+        # Brute force over the whole matrix, the baseline HNSW has to beat
+        exact_latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            exact_search(corpus, query[None, :], k, space)
+            exact_latencies.append((time.perf_counter() - start) * 1000)
+        exact_p50 = summarize_latencies(exact_latencies)['p50']
+        print(f"\nsize={size}: exact search p50 {exact_p50:.2f}ms")
+
+        for m in ms:
+            for construction_ef in construction_efs:
+                name = f"hnsw_{size}_{m}_{construction_ef}"
+                metadata = hnsw_metadata(space=space, m=m, construction_ef=construction_ef)
+                _, build_s = build_collection(open_client(path), name, corpus, metadata)
+
+                for search_ef in search_efs:
+                    collection = open_with_search_ef(path, name, search_ef, queries[0])
+                    result = measure(collection, queries, truth, k)
+                    rows.append({
+                        'size': size,
+                        'space': space,
+                        'm': m,
+                        'construction_ef': construction_ef,
+                        'search_ef': search_ef,
+                        'build_s': build_s,
+                        'recall_at_k': result['recall_at_k'],
+                        'latency_p50_ms': result['latency_ms']['p50'],
+                        'latency_p95_ms': result['latency_ms']['p95'],
+                        'exact_p50_ms': exact_p50
+                    })
+                    print(f"  M={m} construction_ef={construction_ef} search_ef={search_ef}: "
+                          f"recall@{k} {result['recall_at_k']:.3f}, p50 {result['latency_ms']['p50']:.2f}ms "
+                          f"(build {build_s:.1f}s)")
+
+                open_client(path).delete_collection(name)
+
+    shutil.rmtree(path, ignore_errors=True)
+    return rows
+
+
+def pick_settings(rows: List[Dict[str, Any]], recall_target: float) -> Dict[int, Optional[Dict[str, Any]]]:
+    """Fastest (p50) setting meeting the recall target, per corpus size."""
+    picks = {}
+    for size in dict.fromkeys(row['size'] for row in rows):
+        passing = [row for row in rows if row['size'] == size and row['recall_at_k'] >= recall_target]
+        picks[size] = min(passing, key=lambda r: (r['latency_p50_ms'], r['build_s'])) if passing else None
+    return picks
+
+
+def main():
+    """Run HNSW benchmark."""
+    parser = argparse.ArgumentParser(description='Measure HNSW recall@k and latency across settings and corpus sizes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000], help='Corpus sizes (chunks)')
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32], help='HNSW M values')
+    parser.add_argument('--construction-ef', type=int, nargs='+', default=[100, 200],
+                        help='HNSW construction_ef values')
+    parser.add_argument('--search-ef', type=int, nargs='+', default=[10, 20, 50, 100, 200],
+                        help='HNSW search ef values')
+    parser.add_argument('--space', choices=HNSW_SPACES, default='l2', help='Distance space')
+    parser.add_argument('--top-k', type=int, default=5, help='k for recall@k')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per setting')
+    parser.add_argument('--dim', type=int, default=384, help='Embedding dimension')
+    parser.add_argument('--recall-target', type=float, default=0.95, help='Minimum acceptable recall@k')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic vectors')
+    parser.add_argument('--output', default=str(ROOT / 'evaluation_results' / 'hnsw_benchmark.csv'),
+                        help='Where to write the results CSV')
+
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.sizes, args.m, args.construction_ef, args.search_ef,
+                         args.space, args.top_k, args.queries, args.dim, args.seed)
+    picks = pick_settings(rows, args.recall_target)
+
+    print(f"\nFASTEST SETTING WITH RECALL@{args.top_k} >= {args.recall_target:.2f}")
+    print("=" * 80)
+    for size, row in picks.items():
+        if row is None:
+            print(f"  size={size}: no setting met the target, raise --search-ef or --m")
+            continue
+        print(f"  size={size}: M={row['m']} construction_ef={row['construction_ef']} search_ef={row['search_ef']} "
+              f"-> recall {row['recall_at_k']:.3f}, p50 {row['latency_p50_ms']:.2f}ms "
+              f"(exact {row['exact_p50_ms']:.2f}ms)")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_csv(output, index=False)
+    with open(output.with_suffix('.json'), 'w') as f:
+        json.dump({
+            'recall_target': args.recall_target,
+            'top_k': args.top_k,
+            'picks': {str(size): row for size, row in picks.items()}
+        }, f, indent=2)
+    print(f"\nResults saved to {output} (picks in {output.with_suffix('.json')})")
+
+
+if __name__ == "__main__":
+    main()
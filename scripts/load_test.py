@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the /chat endpoint.
+Sends requests at a target rate and reports throughput, latency percentiles and error rates.
+
+Example (offline, against the fake LLM):
+    python src/fake_openrouter.py --latency-ms 800 --latency-distribution lognormal
+    OPENROUTER_BASE_URL=http://localhost:8001/api/v1 OPENROUTER_API_KEY=fake OPENROUTER_RATE_LIMIT_RPM=0 python app.py
+    python scripts/load_test.py --rps 5 --duration 30
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+import requests
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.latency import summarize_latencies
+
+DEFAULT_QUESTIONS = [
+    "How many vacation days do employees get?",
+    "Can I work from home?",
+    "What is the meal allowance for business trips?",
+    "What is the password policy?",
+    "What is the dress code policy?",
+    "How do I report a security incident?",
+]
+
+
+def load_questions(path: str) -> List[str]:
+    """Load questions from a text file (one per line) or JSONL file with a 'query'/'question' field."""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                questions.append(record.get('question') or record['query'])
+            else:
+                questions.append(line)
+    return questions
+
+
+def run_load_test(url: str, questions: List[str], rps: float, duration: float,
+                  max_in_flight: int = 64, timeout: float = 60.0) -> Dict[str, Any]:
+    """Drive the endpoint at a fixed arrival rate and collect per-request outcomes."""
+    outcomes = []
+    lock = threading.Lock()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_in_flight, pool_maxsize=max_in_flight)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    def send(question: str, scheduled: float):
+        # Latency counts from the scheduled send time, so queueing for a free worker is included
+        # (measuring from when the worker starts would hide it: coordinated omission)
+        try:
+            response = session.post(url, json={'question': question}, timeout=timeout)
+            status = str(response.status_code)
+        except requests.Timeout:
+            status = 'timeout'
+        except requests.RequestException:
+            status = 'connection_error'
+        latency_ms = (time.perf_counter() - scheduled) * 1000
+        with lock:
+            outcomes.append((status, latency_ms))
+
+    total_requests = int(rps * duration)
+    start_time = time.perf_counter()
+
+    # Open loop: requests are scheduled on a fixed clock regardless of how slow responses are
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for i in range(total_requests):
+            scheduled = start_time + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, questions[i % len(questions)], scheduled)
+
+    elapsed = time.perf_counter() - start_time
+    return build_report(outcomes, elapsed, rps)
+
+
+def build_report(outcomes: List[tuple], elapsed: float, target_rps: float) -> Dict[str, Any]:
+    """Summarize request outcomes."""
+    status_counts = Counter(status for status, _ in outcomes)
+    successes = [latency for status, latency in outcomes if status == '200']
+    total = len(outcomes)
+    errors = total - len(successes)
+
+    return {
+        'target_rps': target_rps,
+        'duration_s': elapsed,
+        'requests': total,
+        'successful': len(successes),
+        'throughput_rps': len(successes) / elapsed if elapsed else 0.0,
+        'error_rate': errors / total if total else 0.0,
+        'status_counts': dict(status_counts),
+        'latency_ms': summarize_latencies(successes),
+        'latency_all_ms': summarize_latencies([latency for _, latency in outcomes])
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human-readable load test report."""
+    latency = report['latency_ms']
+    print("\nLOAD TEST REPORT")
+    print("=" * 50)
+    print(f"Target RPS: {report['target_rps']}")
+    print(f"Duration: {report['duration_s']:.1f}s")
+    print(f"Requests: {report['requests']} ({report['successful']} successful)")
+    print(f"Throughput: {report['throughput_rps']:.2f} req/s")
+    print(f"Error rate: {report['error_rate']:.2%}")
+    print(f"Status codes: {report['status_counts']}")
+    print(f"Latency p50: {latency['p50']:.1f}ms")
+    print(f"Latency p95: {latency['p95']:.1f}ms")
+    print(f"Latency p99: {latency['p99']:.1f}ms")
+
+
+def main():
+    """Run load test."""
+    parser = argparse.ArgumentParser(description='Load test the /chat endpoint')
+    parser.add_argument('--url', default='http://localhost:5000/chat', help='Chat endpoint URL')
+    parser.add_argument('--rps', type=float, default=5.0, help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=30.0, help='Test duration in seconds')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='Maximum concurrent requests')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+    parser.add_argument('--questions', help='Question file (.txt one per line, or .jsonl)')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions) if args.questions else DEFAULT_QUESTIONS
+    report = run_load_test(args.url, questions, args.rps, args.duration, args.max_in_flight, args.timeout)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
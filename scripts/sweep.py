@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Chunking and top_k parameter sweep.
+Builds a temporary in-memory index for every chunk size/overlap pair, runs the
+retrieval evaluation for each top_k and reports which configurations are on the
+Pareto frontier of retrieval quality against prompt tokens and retrieval latency.
+Chunks whose text is unchanged between configurations reuse cached embeddings.
+
+Example (no network or API key needed):
+    python scripts/sweep.py --chunk-sizes 400 600 800 1000 --overlaps 100 150 200 --top-k 3 5 8
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any
+
+import chromadb
+import pandas as pd
+from chromadb.config import Settings
+
+# Add src directory to path for imports
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from ingest import DocumentProcessor, TextChunker
+from rag import RAGSystem
+from evaluate import RAGEvaluator, DEFAULT_QUERIES_PATH, RESULTS_DIR
+
+QUALITY_METRICS = ('ndcg_at_k', 'recall_at_k', 'mrr')
+
+
+class EmbeddingCache:
+    """Chunk embeddings keyed by text, shared by every configuration of a sweep."""
+
+    def __init__(self, model):
+        self.model = model
+        self._vectors: Dict[str, List[float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return embeddings for texts, encoding only those not seen before in one batch."""
+        missing = [text for text in dict.fromkeys(texts) if text not in self._vectors]
+        if missing:
+            vectors = self.model.encode(missing, batch_size=32, show_progress_bar=False)
+            self._vectors.update(zip(missing, vectors.tolist()))
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [self._vectors[text] for text in texts]
+
+
+def load_documents(corpus: Path) -> List[Dict[str, Any]]:
+    """Parse every supported file in the corpus."""
+    processor = DocumentProcessor()
+    paths = sorted(p for p in corpus.rglob('*')
+                   if p.is_file() and p.suffix.lower() in processor.supported_extensions)
+    return [document for document in (processor.process_file(p) for p in paths) if document]
+
+
+def build_index(client, name: str, chunks: List[Dict[str, Any]], embeddings: List[List[float]]):
+    """Create an in-memory collection laid out like the ingested one."""
+    collection = client.create_collection(name=name)
+    collection.add(
+        ids=[chunk['id'] for chunk in chunks],
+        documents=[chunk['text'] for chunk in chunks],
+        embeddings=embeddings,
+        metadatas=[{
+            'source_id': chunk['source_id'],
+            'title': chunk['title'],
+            'chunk_id': chunk['chunk_id'],
+            'file_type': chunk['file_type']
+        } for chunk in chunks]
+    )
+    return collection
+
+
+def mark_pareto(rows: List[Dict[str, Any]], quality_metric: str):
+    """Flag rows no other row beats on quality, prompt tokens and p95 latency at once."""
+    def dominates(a, b):
+        no_worse = (a[quality_metric] >= b[quality_metric]
+                    and a['prompt_tokens'] <= b['prompt_tokens']
+                    and a['latency_p95_ms'] <= b['latency_p95_ms'])
+        better = (a[quality_metric] > b[quality_metric]
+                  or a['prompt_tokens'] < b['prompt_tokens']
+                  or a['latency_p95_ms'] < b['latency_p95_ms'])
+        return no_worse and better
+
+    for row in rows:
+        row['pareto'] = not any(dominates(other, row) for other in rows if other is not row)
+
+
+def run_sweep(rag_system: RAGSystem, evaluator: RAGEvaluator, documents: List[Dict[str, Any]],
+              chunk_sizes: List[int], overlaps: List[int], top_ks: List[int]) -> List[Dict[str, Any]]:
+    """Evaluate retrieval for every chunk size, overlap and top_k combination."""
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    cache = EmbeddingCache(rag_system.embedder)
+
+    # Queries are the same for every configuration, encode them once
+    queries = [q['query'] for q in evaluator.evaluation_queries]
+    query_embeddings = rag_system.embedder.encode(queries, batch_size=len(queries))
+
+    rows = []
+    for chunk_size in chunk_sizes:
+        for overlap in overlaps:
+            if overlap >= chunk_size:
+                print(f"Skipping chunk_size={chunk_size} overlap={overlap}: overlap must be smaller")
+                continue
+
+            chunker = TextChunker(chunk_size=chunk_size, overlap=overlap)
+            chunks = [chunk for document in documents for chunk in chunker.chunk_document(document)]
+
+            start = time.perf_counter()
+            embeddings = cache.embed([chunk['text'] for chunk in chunks])
+            embed_ms = (time.perf_counter() - start) * 1000
+
+            name = f"sweep_{chunk_size}_{overlap}"
+            rag_system.use_collection(build_index(client, name, chunks, embeddings))
+
+            for top_k in top_ks:
+                rag_system.top_k = top_k
+                summary = evaluator.run_retrieval_evaluation(query_embeddings=query_embeddings, save=False)
+                rows.append({
+                    'chunk_size': chunk_size,
+                    'overlap': overlap,
+                    'top_k': top_k,
+                    'chunks': len(chunks),
+                    'recall_at_k': summary['recall_at_k'],
+                    'mrr': summary['mrr'],
+                    'ndcg_at_k': summary['ndcg_at_k'],
+                    'prompt_tokens': summary['prompt_tokens']['mean'],
+                    'latency_p50_ms': summary['retrieval_latency_ms']['p50'],
+                    'latency_p95_ms': summary['retrieval_latency_ms']['p95'],
+                    'embed_ms': embed_ms
+                })
+                print(f"chunk_size={chunk_size} overlap={overlap} top_k={top_k}: "
+                      f"nDCG {summary['ndcg_at_k']:.3f}, ~{summary['prompt_tokens']['mean']:.0f} prompt tokens")
+
+            client.delete_collection(name)
+
+    print(f"Embedding cache: {cache.hits} hits, {cache.misses} chunks encoded")
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], quality_metric: str):
+    """Print every configuration, best quality first, with the frontier marked."""
+    print(f"\nPARAMETER SWEEP ({quality_metric} vs prompt tokens vs p95 latency, * = Pareto frontier)")
+    print("=" * 96)
+    print(f"  {'chunk':>6}{'overlap':>9}{'top_k':>7}{'chunks':>8}{'recall@k':>10}{'MRR':>8}{'nDCG@k':>9}"
+          f"{'tokens':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for row in sorted(rows, key=lambda r: (-r[quality_metric], r['prompt_tokens'])):
+        marker = '*' if row['pareto'] else ' '
+        print(f"{marker} {row['chunk_size']:>6}{row['overlap']:>9}{row['top_k']:>7}{row['chunks']:>8}"
+              f"{row['recall_at_k']:>10.3f}{row['mrr']:>8.3f}{row['ndcg_at_k']:>9.3f}"
+              f"{row['prompt_tokens']:>9.0f}{row['latency_p50_ms']:>9.2f}{row['latency_p95_ms']:>9.2f}")
+
+
+def main():
+    """Run parameter sweep."""
+    parser = argparse.ArgumentParser(description='Sweep chunking and top_k against retrieval quality and cost')
+    parser.add_argument('--corpus', default='policies', help='Path to corpus directory')
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[400, 600, 800, 1000],
+                        help='Chunk sizes in characters')
+    parser.add_argument('--overlaps', type=int, nargs='+', default=[100, 150, 200],
+                        help='Overlap sizes in characters')
+    parser.add_argument('--top-k', type=int, nargs='+', default=[3, 5, 8], help='top_k values')
+    parser.add_argument('--embedding-model', default='all-MiniLM-L6-v2', help='Embedding model name')
+    parser.add_argument('--queries', type=Path, default=DEFAULT_QUERIES_PATH, help='JSONL evaluation set')
+    parser.add_argument('--quality-metric', choices=QUALITY_METRICS, default='ndcg_at_k',
+                        help='Quality axis of the Pareto frontier')
+    parser.add_argument('--output', default=str(RESULTS_DIR / "sweep.csv"), help='Where to write the results CSV')
+
+    args = parser.parse_args()
+
+    documents = load_documents(Path(args.corpus))
+    if not documents:
+        print(f"No documents found in {args.corpus}")
+        sys.exit(1)
+
+    # Retrieval only: no persisted index, LLM or query micro-batching
+    rag_system = RAGSystem(embedding_model=args.embedding_model, defer_connect=True,
+                           require_llm=False, embed_batch_window_ms=None)
+    evaluator = RAGEvaluator(rag_system, args.queries)
+
+    rows = run_sweep(rag_system, evaluator, documents, args.chunk_sizes, args.overlaps, args.top_k)
+    mark_pareto(rows, args.quality_metric)
+    print_report(rows, args.quality_metric)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_csv(output, index=False)
+    with open(output.with_suffix('.json'), 'w') as f:
+        json.dump({
+            'quality_metric': args.quality_metric,
+            'pareto': [row for row in rows if row['pareto']]
+        }, f, indent=2)
+    print(f"\nResults saved to {output} (frontier in {output.with_suffix('.json')})")
+
+
+if __name__ == "__main__":
+    main()
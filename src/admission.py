@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Admission control for the /chat endpoint.
+Caps the number of concurrent RAG queries and the number of requests waiting for
+a slot; anything beyond that is rejected immediately so tail latency stays bounded.
+"""
+
+import math
+import time
+import logging
+import threading
+from typing import Dict, Any
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT = REGISTRY.gauge('rag_admission_in_flight', 'Queries currently being processed')
+QUEUE_DEPTH = REGISTRY.gauge('rag_admission_queue_depth', 'Requests waiting for a query slot')
+WAIT_TIME = REGISTRY.histogram('rag_admission_wait_seconds', 'Time spent waiting for a query slot')
+REJECTED = REGISTRY.counter('rag_admission_rejected_total', 'Requests rejected by admission control', ('reason',))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded wait queue."""
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, max_wait_s: float = 10.0):
+        """Initialize controller.
+
+        Args:
+            max_concurrent: Queries processed at the same time
+            max_queue: Requests allowed to wait for a slot, beyond that requests fail fast
+            max_wait_s: Longest a request waits for a slot before it is rejected
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        # Exponentially weighted average query time, used to estimate Retry-After
+        self._avg_service_s = 1.0
+
+    def admit(self) -> '_Admission':
+        """Context manager holding a query slot for the duration of the block."""
+        return _Admission(self)
+
+    def acquire(self):
+        """Wait for a query slot or raise AdmissionRejected; returns the admission time."""
+        start = time.perf_counter()
+        with self._cond:
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    self._reject('queue_full')
+
+                self._waiting += 1
+                QUEUE_DEPTH.set(self._waiting)
+                try:
+                    deadline = start + self.max_wait_s
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._reject('wait_timeout')
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                    QUEUE_DEPTH.set(self._waiting)
+
+            self._active += 1
+            IN_FLIGHT.set(self._active)
+
+        admitted = time.perf_counter()
+        WAIT_TIME.observe(admitted - start)
+        return admitted
+
+    def release(self, service_s: float):
+        """Free a query slot and wake the next waiter."""
+        with self._cond:
+            self._active -= 1
+            IN_FLIGHT.set(self._active)
+            self._avg_service_s = 0.9 * self._avg_service_s + 0.1 * service_s
+            self._cond.notify()
+
+    def _reject(self, reason: str):
+        """Count and raise a rejection; caller holds the lock."""
+        REJECTED.inc(reason=reason)
+        # Time for the current backlog to drain through the available slots
+        backlog = self._waiting + self._active
+        retry_after = max(1, math.ceil(backlog * self._avg_service_s / self.max_concurrent))
+        logger.warning(f"Admission rejected ({reason}), retry after {retry_after}s")
+        raise AdmissionRejected(reason, retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limiter state."""
+        return {
+            'in_flight': self._active,
+            'queue_depth': self._waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'avg_query_ms': round(self._avg_service_s * 1000, 1)
+        }
+
+
+class _Admission:
+    """Holds one admission slot."""
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+
+    def __enter__(self):
+        self.start = self.controller.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller.release(time.perf_counter() - self.start)
+        return False
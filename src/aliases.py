@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Versioned collections behind alias pointers.
+Ingestion writes every build to a new collection (e.g. company_policies_v20261019T120000123456_3f2a9c1e)
+tagged with its embedding model and chunk parameters. Serving resolves the alias
+`company_policies` through aliases.json in the Chroma persist directory, so switching
+to a new build, or back to the previous one, is a single atomic file replace that
+running RAGSystem instances pick up without a restart.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Collection, Iterator
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALIAS = "company_policies"
+ALIASES_FILE = "aliases.json"
+LOCK_SUFFIX = ".lock"
+PARENTS_SUFFIX = "_parents"
+
+# Collection metadata shown by `list`
+BUILD_PARAMS = ('embedding_model', 'chunk_size', 'overlap', 'child_chunk_size', 'child_overlap',
+                'hnsw:space', 'hnsw:M', 'hnsw:construction_ef', 'hnsw:search_ef')
+
+
+def versioned_name(alias: str, params: Dict[str, Any]) -> str:
+    """Collection name for a new build: alias, UTC timestamp and a hash of the build parameters.
+
+    The timestamp has microseconds, so builds with the same parameters started in the same second
+    get distinct names; names still sort by build time.
+    """
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    return f"{alias}_v{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_{digest}"
+
+
+def parents_name(collection: str) -> str:
+    """Companion collection holding the parent sections of a small-to-big version."""
+    return f"{collection}{PARENTS_SUFFIX}"
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive advisory lock on a file, across processes. Yields whether it was acquired,
+    which is always True when blocking."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+b') as f:
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            acquired = True
+        except OSError:
+            if blocking:
+                raise
+            # Another process holds the lock
+            acquired = False
+        try:
+            yield acquired
+        finally:
+            # Closing the file releases an flock
+            if acquired and not fcntl:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def set_search_ef(collection, search_ef: int) -> Optional[int]:
+    """Store a new HNSW search ef with a collection. Returns the previous value.
+
+    Chroma reads it when a process loads the index, so set it before activating the
+    collection; serving processes only read it.
+    """
+    previous = ((collection.configuration or {}).get('hnsw') or {}).get('ef_search')
+    if previous != search_ef:
+        collection.modify(configuration={'hnsw': {'ef_search': search_ef}})
+        logger.info(f"HNSW search ef for {collection.name}: {previous} -> {search_ef}")
+    return previous
+
+
+class AliasRegistry:
+    """Alias -> collection pointers with history, stored as JSON next to the Chroma index."""
+
+    def __init__(self, persist_dir: str = "./chroma_db"):
+        """Initialize registry.
+
+        Args:
+            persist_dir: Chroma persistence directory holding aliases.json
+        """
+        self.path = Path(persist_dir) / ALIASES_FILE
+        self.lock_path = Path(persist_dir) / f"{ALIASES_FILE}{LOCK_SUFFIX}"
+
+    def version(self) -> Optional[int]:
+        """Modification stamp of the registry file (None when it does not exist); cheap to poll."""
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """All aliases with their current target and history (newest last)."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def resolve(self, alias: str) -> str:
+        """Collection an alias points at; an unregistered alias names a collection directly."""
+        entry = self.load().get(alias)
+        return entry['current'] if entry else alias
+
+    def activate(self, alias: str, collection: str, existing: Optional[Collection[str]] = None) -> Optional[str]:
+        """Point alias at collection, remembering the previous target for rollback.
+
+        Before its first activation an alias serves the collection of the same name; that
+        target is only remembered if it is among the existing collection names (when given).
+        Returns the remembered previous target, or None.
+        """
+        with file_lock(self.lock_path):
+            aliases = self.load()
+            entry = aliases.setdefault(alias, {'current': alias, 'history': []})
+            previous = entry['current']
+            if previous == collection:
+                return None
+            if existing is not None and previous not in existing:
+                logger.info(f"Alias '{alias}' target {previous} does not exist, not keeping it for rollback")
+                previous = None
+            else:
+                entry['history'].append(previous)
+            entry['current'] = collection
+            entry['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            self._write(aliases)
+        logger.info(f"Alias '{alias}' -> {collection} (was {previous})")
+        return previous
+
+    def rollback(self, alias: str) -> str:
+        """Point alias back at its previous target. Returns the restored collection."""
+        with file_lock(self.lock_path):
+            aliases = self.load()
+            entry = aliases.get(alias)
+            if not entry or not entry['history']:
+                raise ValueError(f"Alias '{alias}' has no previous collection to roll back to")
+            rolled_back = entry['current']
+            entry['current'] = entry['history'].pop()
+            entry['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            self._write(aliases)
+        logger.info(f"Alias '{alias}' rolled back {rolled_back} -> {entry['current']}")
+        return entry['current']
+
+    def forget(self, alias: str, collections: List[str]):
+        """Drop deleted collections from an alias's rollback history."""
+        with file_lock(self.lock_path):
+            aliases = self.load()
+            entry = aliases.get(alias)
+            if not entry or not set(collections) & set(entry['history']):
+                return
+            entry['history'] = [name for name in entry['history'] if name not in collections]
+            self._write(aliases)
+
+    def _write(self, aliases: Dict[str, Dict[str, Any]]):
+        """Replace the registry file atomically so readers never see a partial write; writers hold the lock."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{ALIASES_FILE}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(aliases, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def main(argv: Optional[List[str]] = None):
+    """Inspect and switch collection versions."""
+    parser = argparse.ArgumentParser(description='List, activate, roll back and prune collection versions')
+    parser.add_argument('--persist-dir', default=os.getenv('CHROMA_PERSIST_DIRECTORY', './chroma_db'),
+                        help='Chroma persistence directory')
+    parser.add_argument('--alias', default=DEFAULT_ALIAS, help='Alias to operate on')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='Show versions of the alias and which one is live')
+    activate_parser = subparsers.add_parser('activate', help='Point the alias at a collection')
+    activate_parser.add_argument('collection', help='Collection name')
+    activate_parser.add_argument('--hnsw-search-ef', type=int,
+                                 help='Store this HNSW query-time candidate list with the collection first')
+    subparsers.add_parser('rollback', help='Point the alias back at its previous collection')
+    prune_parser = subparsers.add_parser('prune', help='Delete versions older than the live one and not kept for rollback')
+    prune_parser.add_argument('--keep', type=int, default=2, help='Previous versions to keep for rollback')
+
+    args = parser.parse_args(argv)
+    registry = AliasRegistry(args.persist_dir)
+
+    if args.command == 'rollback':
+        try:
+            collection = registry.rollback(args.alias)
+        except ValueError as e:
+            print(str(e))
+            return 1
+        print(f"{args.alias} -> {collection}")
+        return 0
+
+    # Everything else talks to Chroma
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=args.persist_dir, settings=Settings(anonymized_telemetry=False))
+    all_names = {c.name for c in client.list_collections()}
+    # Parent sections travel with their version and are not versions themselves
+    names = sorted(name for name in all_names
+                   if (name == args.alias or name.startswith(f"{args.alias}_v"))
+                   and not name.endswith(PARENTS_SUFFIX))
+
+    if args.command == 'activate':
+        if args.collection not in names:
+            print(f"Collection not found: {args.collection}")
+            return 1
+        if args.hnsw_search_ef:
+            set_search_ef(client.get_collection(args.collection), args.hnsw_search_ef)
+        registry.activate(args.alias, args.collection, all_names)
+        print(f"{args.alias} -> {args.collection}")
+        return 0
+
+    entry = registry.load().get(args.alias, {'current': args.alias, 'history': []})
+
+    if args.command == 'prune':
+        # Keep the live version, recent rollback targets and builds newer than the live one
+        keep = set(entry['history'][-args.keep:]) if args.keep > 0 else set()
+        deleted = [name for name in names if name < entry['current'] and name not in keep]
+        for name in deleted:
+            client.delete_collection(name)
+            if parents_name(name) in all_names:
+                client.delete_collection(parents_name(name))
+            print(f"Deleted {name}")
+        registry.forget(args.alias, deleted)
+        return 0
+
+    for name in names:
+        collection = client.get_collection(name)
+        metadata = collection.metadata or {}
+        marker = '*' if name == entry['current'] else ' '
+        params = ', '.join(f"{key}={metadata[key]}" for key in BUILD_PARAMS if key in metadata)
+        print(f"{marker} {name}  {collection.count()} chunks  {params}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
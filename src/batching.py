@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Dynamic micro-batching for query embeddings.
+Concurrent request threads submit single questions; a background thread gathers
+whatever arrives within a short window (or until the batch is full), encodes it
+as one batch and hands each caller its own vector.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import List
+
+import numpy as np
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = REGISTRY.histogram(
+    'rag_embed_batch_size', 'Queries encoded per micro-batch', buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+
+class BatchingEncoder:
+    """Shares one SentenceTransformer between threads by encoding their queries in micro-batches."""
+
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        """Initialize encoder.
+
+        Args:
+            model: Loaded SentenceTransformer
+            max_batch_size: Maximum queries encoded in one call
+            max_wait_ms: How long to wait for more queries after the first one arrives
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker_pid = None
+
+    def encode(self, text: str) -> np.ndarray:
+        """Encode one query, blocking until its batch has been processed."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        """Start the batching thread, once per process (threads do not survive fork)."""
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                thread.start()
+                self._worker_pid = os.getpid()
+
+    def _run(self):
+        """Collect and encode batches forever."""
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.perf_counter() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    batch.append(pending.get(timeout=timeout) if timeout > 0 else pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: List[tuple]):
+        """Encode a batch and scatter the vectors back to the waiting callers."""
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = self.model.encode(texts, batch_size=len(texts))
+            BATCH_SIZE.observe(len(texts))
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+        except Exception as e:
+            logger.error(f"Batch encoding failed for {len(texts)} queries: {e}")
+            for _, future in batch:
+                future.set_exception(e)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+In-process LRU caches for query embeddings and answers.
+Answers are keyed by the normalized question, so trivially different spellings of a
+common question ("How many PTO days?" / "how many pto days") share an entry.
+Lookups are counted per cache in rag_cache_requests_total for hit-ratio monitoring.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = REGISTRY.counter('rag_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+CACHE_ENTRIES = REGISTRY.gauge('rag_cache_entries', 'Entries held per cache', ('cache',))
+
+
+def normalize_question(question: str) -> str:
+    """Cache key for a question: lower case, single spaces, no trailing punctuation."""
+    return ' '.join(question.lower().split()).rstrip('?!. ')
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with an optional entry lifetime."""
+
+    def __init__(self, name: str, max_entries: int = 1000, ttl_seconds: Optional[float] = None):
+        """Initialize cache.
+
+        Args:
+            name: Cache label in metrics and stats
+            max_entries: Entries kept before the least recently used is evicted
+            ttl_seconds: Entry lifetime, None keeps entries until evicted
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        CACHE_REQUESTS.inc(cache=self.name, result='miss' if entry is None else 'hit')
+        return None if entry is None else entry[0]
+
+    def put(self, key: str, value: Any, age_seconds: float = 0.0):
+        """Store a value, evicting the least recently used entry when full.
+
+        age_seconds counts against the lifetime of a value computed earlier, e.g. by another process.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() - age_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        CACHE_ENTRIES.set(size, cache=self.name)
+
+    def __contains__(self, key: str) -> bool:
+        """Whether key is cached and unexpired, without counting a lookup."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and (self.ttl_seconds is None or time.monotonic() - entry[1] <= self.ttl_seconds)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+        CACHE_ENTRIES.set(0, cache=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entries, hits, misses and hit ratio since start."""
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None
+        }
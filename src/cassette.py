@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Record/replay cassette for OpenRouter chat completions.
+In record mode every completion is stored on disk keyed by model, prompt hash and
+sampling parameters; replay mode serves those responses without touching the network,
+so evaluations can be re-run quickly and deterministically.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'record', 'replay', 'auto')
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recording exists for a request."""
+
+
+class LLMCassette:
+    """Directory of recorded OpenRouter responses, one JSON file per request key."""
+
+    def __init__(self, directory: str = "./cassettes", mode: str = "replay"):
+        """Initialize cassette.
+
+        Args:
+            directory: Where recordings are stored
+            mode: record (always call and store), replay (disk only, misses fail)
+                or auto (replay when recorded, otherwise call and store)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['LLMCassette']:
+        """Create the cassette from environment variables, None when disabled."""
+        mode = os.getenv("LLM_CASSETTE_MODE", "off")
+        if mode == "off":
+            return None
+        return cls(directory=os.getenv("LLM_CASSETTE_DIR", "./cassettes"), mode=mode)
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        """Key a chat completion request by (model, prompt hash, params)."""
+        params = {k: v for k, v in request.items() if k not in ('model', 'messages')}
+        prompt_hash = hashlib.sha256(
+            json.dumps(request['messages'], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        material = json.dumps([request['model'], prompt_hash, params], sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]
+
+    def lookup(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the recorded response body, None if the request should go to the network.
+
+        Raises CassetteMiss in replay mode when nothing was recorded.
+        """
+        if self.mode == 'record':
+            return None
+
+        path = self.directory / f"{self.key(request)}.json"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['response']
+        except FileNotFoundError:
+            if self.mode == 'replay':
+                raise CassetteMiss(f"No recording for {request['model']} request {path.name}")
+            return None
+
+    def record(self, request: Dict[str, Any], response: Dict[str, Any]):
+        """Store a successful response for the request."""
+        entry = {
+            'model': request['model'],
+            'params': {k: v for k, v in request.items() if k not in ('model', 'messages')},
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'request': request,
+            'response': response
+        }
+        path = self.directory / f"{self.key(request)}.json"
+        # Write then rename so concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, path)
+        logger.debug(f"Recorded LLM response {path.name}")
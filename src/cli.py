@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Single command-line entry point for the RAG system.
+Subcommand modules are imported only when that subcommand runs, so light commands
+(report, stats, models) never load torch, sentence-transformers, chromadb, pandas
+or matplotlib.
+
+Usage:
+    python -m src.cli <command> [options]
+    python -m src.cli --timing stats
+"""
+
+import sys
+import time
+import importlib
+from typing import List, Optional
+
+# name -> (module, help); every module exposes main(argv)
+COMMANDS = {
+    'ingest': ('src.ingest', 'Parse, chunk, embed and store the policy corpus'),
+    'query': ('src.rag', 'Answer questions from the command line'),
+    'eval': ('src.evaluate', 'Run the evaluation set (full, retrieval or report)'),
+    'report': ('src.report', 'Analyze saved evaluation results'),
+    'stats': ('src.stats', 'Show Chroma index statistics'),
+    'collections': ('src.aliases', 'List, activate, roll back or prune collection versions'),
+    'snapshot': ('src.snapshot', 'Export or inspect a single-file index snapshot'),
+    'querylog': ('src.querylog', 'Top questions, latency percentiles and cache hit ratios from the query log'),
+    'models': ('src.openrouter_models', 'List free OpenRouter models'),
+}
+
+# Commands expected to start in well under a second
+LIGHT_COMMANDS = ('report', 'stats', 'models', 'snapshot', 'querylog')
+
+
+def print_usage():
+    """Print the command list."""
+    print("usage: python -m src.cli [--timing] <command> [options]\n")
+    print("commands:")
+    for name, (_, help_text) in COMMANDS.items():
+        print(f"  {name:<12} {help_text}")
+    print("\nRun 'python -m src.cli <command> --help' for command options.")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Dispatch to a subcommand."""
+    start = time.perf_counter()
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    timing = '--timing' in argv[:1]
+    if timing:
+        argv = argv[1:]
+
+    if not argv or argv[0] in ('-h', '--help'):
+        print_usage()
+        return 0
+
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n", file=sys.stderr)
+        print_usage()
+        return 2
+
+    module = importlib.import_module(COMMANDS[command][0])
+    sys.argv[0] = f"src.cli {command}"  # argparse prog name in usage lines
+    import_ms = (time.perf_counter() - start) * 1000
+
+    try:
+        code = module.main(args)
+    except SystemExit as e:
+        # argparse --help and errors exit from inside main
+        code = e.code
+
+    if timing:
+        total_ms = (time.perf_counter() - start) * 1000
+        print(f"[{command}] import {import_ms:.0f}ms, total {total_ms:.0f}ms", file=sys.stderr)
+    return code or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,18 +7,29 @@ Measures groundedness, citation accuracy, and latency.
 import os
 import json
 import time
+import math
 import logging
-from typing import List, Dict, Any, Tuple
+import argparse
+from typing import List, Dict, Any, Tuple, Optional
 import statistics
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 
-from rag import RAGSystem
+try:
+    from src.rag import RAGSystem
+    from src.ratelimit import TokenBucket, bucket_name
+    from src.latency import summarize_latencies, percentile
+    from src.cassette import LLMCassette
+except ImportError:
+    from rag import RAGSystem
+    from ratelimit import TokenBucket, bucket_name
+    from latency import summarize_latencies, percentile
+    from cassette import LLMCassette
 
 # Load environment variables
 load_dotenv()
@@ -27,181 +38,135 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Evaluation set shipped with the repository
+DEFAULT_QUERIES_PATH = Path(__file__).parent.parent / "evaluation" / "queries.jsonl"
+
+# Evaluation output; results.jsonl grows by one line per completed query
+RESULTS_DIR = Path("evaluation_results")
+RESULTS_LOG = RESULTS_DIR / "results.jsonl"
+
+# Rough size of an English token for prompt accounting without the model's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Failures that a retry cannot fix (replaying a request that was never recorded)
+NON_RETRYABLE_ERRORS = {'cassette_miss'}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a prompt."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
 
 class RAGEvaluator:
     """Evaluates RAG system performance across multiple metrics."""
     
-    def __init__(self, rag_system: RAGSystem):
+    def __init__(self, rag_system: Optional[RAGSystem], queries_path: Path = DEFAULT_QUERIES_PATH):
         self.rag_system = rag_system
-        self.evaluation_queries = self._load_evaluation_queries()
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        self.evaluation_queries = self._load_evaluation_queries(queries_path)
+        self._embedder = None
     
-    def _load_evaluation_queries(self) -> List[Dict[str, Any]]:
-        """Load evaluation queries with expected topics."""
-        return [
-            {
-                "query": "How many vacation days do employees get?",
-                "category": "PTO",
-                "expected_topics": ["vacation", "pto", "accrual", "days"]
-            },
-            {
-                "query": "What is the sick leave policy?",
-                "category": "PTO", 
-                "expected_topics": ["sick leave", "medical", "hours", "accrual"]
-            },
-            {
-                "query": "Can I work from home?",
-                "category": "Remote Work",
-                "expected_topics": ["remote work", "home office", "hybrid", "approval"]
-            },
-            {
-                "query": "What are the requirements for remote work?",
-                "category": "Remote Work",
-                "expected_topics": ["eligibility", "equipment", "internet", "workspace"]
-            },
-            {
-                "query": "How do I get reimbursed for travel expenses?",
-                "category": "Expenses",
-                "expected_topics": ["travel", "reimbursement", "receipts", "approval"]
-            },
-            {
-                "query": "What is the meal allowance for business trips?",
-                "category": "Expenses",
-                "expected_topics": ["meals", "allowance", "per diem", "business"]
-            },
-            {
-                "query": "What is the password policy?",
-                "category": "Security",
-                "expected_topics": ["password", "complexity", "length", "requirements"]
-            },
-            {
-                "query": "How should I handle confidential information?",
-                "category": "Security",
-                "expected_topics": ["confidential", "data", "classification", "protection"]
-            },
-            {
-                "query": "What holidays does the company observe?",
-                "category": "PTO",
-                "expected_topics": ["holidays", "observed", "paid", "floating"]
-            },
-            {
-                "query": "What is the dress code policy?",
-                "category": "Employee Handbook",
-                "expected_topics": ["dress code", "business casual", "professional", "friday"]
-            },
-            {
-                "query": "How do I report a security incident?",
-                "category": "Security",
-                "expected_topics": ["incident", "reporting", "security team", "immediately"]
-            },
-            {
-                "query": "What equipment does the company provide for remote work?",
-                "category": "Remote Work",
-                "expected_topics": ["equipment", "laptop", "monitor", "reimbursement"]
-            },
-            {
-                "query": "What is the probationary period for new employees?",
-                "category": "Employee Handbook",
-                "expected_topics": ["probationary", "90 days", "new employees", "evaluation"]
-            },
-            {
-                "query": "How much notice do I need to give for vacation time?",
-                "category": "PTO",
-                "expected_topics": ["advance notice", "vacation", "approval", "weeks"]
-            },
-            {
-                "query": "What expenses are not reimbursable?",
-                "category": "Expenses",
-                "expected_topics": ["non-reimbursable", "personal", "prohibited", "expenses"]
-            },
-            {
-                "query": "What is the company's equal opportunity policy?",
-                "category": "Employee Handbook",
-                "expected_topics": ["equal opportunity", "discrimination", "protected", "employer"]
-            },
-            {
-                "query": "How often should I change my password?",
-                "category": "Security",
-                "expected_topics": ["password", "change", "90 days", "rotation"]
-            },
-            {
-                "query": "What is the bereavement leave policy?",
-                "category": "PTO",
-                "expected_topics": ["bereavement", "family", "paid leave", "days"]
-            },
-            {
-                "query": "Can I use personal devices for work?",
-                "category": "Security",
-                "expected_topics": ["personal devices", "BYOD", "MDM", "security"]
-            },
-            {
-                "query": "What are the core collaboration hours for remote workers?",
-                "category": "Remote Work",
-                "expected_topics": ["core hours", "collaboration", "10 AM", "3 PM"]
-            },
-            {
-                "query": "How do I submit an expense report?",
-                "category": "Expenses",
-                "expected_topics": ["expense report", "submission", "receipts", "approval"]
-            },
-            {
-                "query": "What is the company's mission statement?",
-                "category": "Employee Handbook",
-                "expected_topics": ["mission", "technology solutions", "inclusive", "employees"]
-            },
-            {
-                "query": "What should I do if I lose my company laptop?",
-                "category": "Security",
-                "expected_topics": ["lost device", "report", "remote wipe", "IT security"]
-            },
-            {
-                "query": "How many personal days do employees get?",
-                "category": "PTO",
-                "expected_topics": ["personal days", "3 days", "calendar year", "January"]
-            },
-            {
-                "query": "What is the maximum hotel rate for business travel?",
-                "category": "Expenses",
-                "expected_topics": ["hotel", "maximum", "$200", "major cities"]
-            }
-        ]
+    @property
+    def embedder(self) -> SentenceTransformer:
+        """Scoring model, loaded on first use so retrieval-only runs skip it."""
+        if self._embedder is None:
+            self._embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        return self._embedder
+    
+    def _load_evaluation_queries(self, path: Path) -> List[Dict[str, Any]]:
+        """Load evaluation queries from a JSONL file, one query object per line."""
+        queries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if not entry.get('query'):
+                    raise ValueError(f"{path}:{line_number}: missing 'query'")
+                entry.setdefault('category', 'General')
+                entry.setdefault('expected_topics', [])
+                queries.append(entry)
+        
+        logger.info(f"Loaded {len(queries)} evaluation queries from {path}")
+        return queries
+    
+    def run_full_evaluation(self, parallelism: int = 1, max_attempts: int = 3,
+                            resume: bool = False) -> Dict[str, Any]:
+        """Run complete evaluation suite.
+        
+        Queries run on `parallelism` threads and are paced by the RAG system's shared
+        OpenRouter rate limiter. A query whose answer failed is retried and, if it never
+        succeeds, reported in `failed_queries` instead of being scored.
+        
+        Each outcome is appended to the results log as soon as it completes; with
+        `resume` the log is kept and queries that already succeeded are skipped.
+        """
+        RESULTS_DIR.mkdir(exist_ok=True)
+        
+        completed = self._completed_queries(RESULTS_LOG) if resume else set()
+        pending = [q for q in self.evaluation_queries if q['query'] not in completed]
+        total = len(pending)
+        logger.info(f"Starting full RAG evaluation: {total} queries "
+                    f"({len(completed)} already completed), parallelism {parallelism}")
+        
+        with self._open_log(RESULTS_LOG, resume) as log, \
+                ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+            futures = {executor.submit(self._run_query, query_data, max_attempts): query_data
+                       for query_data in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                query_data = futures[future]
+                response, latency_ms, attempts = future.result()
+                self._append_result(log, query_data, response, latency_ms, attempts)
+                logger.info(f"Evaluated query {done}/{total}: {query_data['query'][:50]}...")
+        
+        evaluation_summary = self.summarize_results()
+        logger.info("Evaluation complete!")
+        return evaluation_summary
     
-    def run_full_evaluation(self) -> Dict[str, Any]:
-        """Run complete evaluation suite."""
-        logger.info("Starting full RAG evaluation")
+    def summarize_results(self, log_path: Path = None) -> Dict[str, Any]:
+        """Score the results log and write the summary, detailed CSV and charts.
+        
+        The latest entry per query wins, so retried queries replace their failures.
+        """
+        latest = self._latest_entries(log_path or RESULTS_LOG)
+        
+        failed = [
+            {key: entry[key] for key in ('query', 'category', 'error', 'attempts')}
+            for entry in latest.values() if entry['status'] != 'ok'
+        ]
+        completed = [entry for entry in latest.values() if entry['status'] == 'ok']
+        
+        # Score every answer in one batch
+        pairs = [(entry['response'], entry) for entry in completed]
+        groundedness_scores = self._evaluate_groundedness(pairs)
+        citation_scores = self._evaluate_citation_accuracy(pairs)
         
         results = []
         latencies = []
-        
-        for i, query_data in enumerate(self.evaluation_queries):
-            logger.info(f"Evaluating query {i+1}/{len(self.evaluation_queries)}: {query_data['query'][:50]}...")
-            
-            # Measure latency
-            start_time = time.time()
-            response = self.rag_system.query(query_data['query'])
-            latency = time.time() - start_time
-            latencies.append(latency * 1000)  # Convert to milliseconds
-            
-            # Evaluate response
-            groundedness = self._evaluate_groundedness(response, query_data)
-            citation_accuracy = self._evaluate_citation_accuracy(response, query_data)
-            
-            result = {
-                'query': query_data['query'],
-                'category': query_data['category'],
+        for entry, groundedness, citation_accuracy in zip(completed, groundedness_scores, citation_scores):
+            response = entry['response']
+            latencies.append(entry['latency_ms'])
+            results.append({
+                'query': entry['query'],
+                'category': entry['category'],
                 'answer': response['answer'],
                 'sources_count': len(response['sources']),
                 'citations_count': len(response['citations']),
-                'latency_ms': latency * 1000,
+                'latency_ms': entry['latency_ms'],
+                'rate_limit_wait_ms': entry.get('rate_limit_wait_ms', 0.0),
                 'groundedness_score': groundedness,
                 'citation_accuracy_score': citation_accuracy,
-                'retrieved_chunks': response['retrieved_chunks']
-            }
-            
-            results.append(result)
+                'retrieved_chunks': response['retrieved_chunks'],
+                'attempts': entry['attempts']
+            })
+        
+        if failed:
+            logger.warning(f"{len(failed)} queries failed and were not scored")
+        if not results:
+            raise RuntimeError("No successful evaluation results to summarize")
         
         # Calculate aggregate metrics
         evaluation_summary = self._calculate_summary_metrics(results, latencies)
+        evaluation_summary['failed_queries'] = failed
         
         # Save detailed results
         self._save_results(results, evaluation_summary)
@@ -209,76 +174,275 @@ class RAGEvaluator:
         # Generate visualizations
         self._generate_visualizations(results)
         
-        logger.info("Evaluation complete!")
         return evaluation_summary
     
-    def _evaluate_groundedness(self, response: Dict[str, Any], query_data: Dict[str, Any]) -> float:
-        """Evaluate if the answer is grounded in retrieved documents.
-        
-        Improved scoring: Requires at least 50% of expected topics to be grounded,
-        rather than 100%, which is more realistic for real-world RAG systems.
+    @staticmethod
+    def _latest_entries(log_path: Path) -> Dict[str, Dict[str, Any]]:
+        """Latest logged entry per query."""
+        latest = {}
+        if log_path.exists():
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a truncated last line; that query simply runs again
+                        continue
+                    latest[entry['query']] = entry
+        return latest
+    
+    def _completed_queries(self, log_path: Path) -> set:
+        """Queries whose latest logged outcome succeeded."""
+        return {query for query, entry in self._latest_entries(log_path).items() if entry['status'] == 'ok'}
+    
+    @staticmethod
+    def _open_log(log_path: Path, resume: bool):
+        """Open the results log for appending, or start a new one."""
+        if not resume:
+            return open(log_path, 'w', encoding='utf-8')
+        
+        log = open(log_path, 'a+', encoding='utf-8')
+        # Terminate a line cut off by a crash so the next entry starts on its own line
+        if log.tell() > 0:
+            log.seek(log.tell() - 1)
+            if log.read(1) != '\n':
+                log.write('\n')
+        return log
+    
+    @staticmethod
+    def _append_result(log, query_data: Dict[str, Any], response: Dict[str, Any],
+                       latency_ms: float, attempts: int):
+        """Append one query outcome to the results log and flush it to disk."""
+        entry = {
+            **query_data,
+            'status': 'failed' if response.get('error') else 'ok',
+            'error': response.get('error'),
+            'attempts': attempts,
+            'latency_ms': latency_ms,
+            # Part of latency_ms queued for a rate limit token, which depends on the run, not the system under test
+            'rate_limit_wait_ms': response.get('timings_ms', {}).get('rate_limit_wait', 0.0),
+            'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'response': {key: response[key] for key in ('answer', 'citations', 'sources', 'retrieved_chunks')}
+        }
+        log.write(json.dumps(entry) + '\n')
+        log.flush()
+        os.fsync(log.fileno())
+    
+    def _run_query(self, query_data: Dict[str, Any], max_attempts: int) -> Tuple[Dict[str, Any], float, int]:
+        """Query the RAG system, retrying failed answers. Returns (response, latency_ms, attempts)."""
+        for attempt in range(1, max_attempts + 1):
+            # Measure latency
+            start_time = time.time()
+            response = self.rag_system.query(query_data['query'])
+            latency_ms = (time.time() - start_time) * 1000
+            
+            if not response.get('error'):
+                break
+            
+            logger.warning(f"Query failed ({response['error']}), attempt {attempt}/{max_attempts}: "
+                           f"{query_data['query'][:50]}")
+            if response['error'] in NON_RETRYABLE_ERRORS:
+                break
+            if attempt < max_attempts:
+                time.sleep(min(2 ** attempt, 30))
+        
+        return response, latency_ms, attempt
+    
+    def run_retrieval_evaluation(self, query_embeddings: Optional[np.ndarray] = None,
+                                 save: bool = True) -> Dict[str, Any]:
+        """Evaluate retrieval only: recall@k, MRR and nDCG@k without any LLM calls.
+        
+        Chunks are relevant when they come from one of the query's `relevant_sources`;
+        queries without them fall back to graded relevance from `expected_topics`. Queries
+        with neither cannot be scored; they are skipped and counted in `skipped_unlabeled`.
+        Also reports the estimated prompt size the retrieved context would produce.
+        Pass `query_embeddings` to reuse vectors across runs (e.g. parameter sweeps).
         """
-        answer = response['answer'].lower()
-        citations = response['citations']
+        queries = [q['query'] for q in self.evaluation_queries]
+        logger.info(f"Starting retrieval evaluation: {len(queries)} queries, top_k {self.rag_system.top_k}")
+        
+        # Encode the whole query set in one batch
+        start_time = time.perf_counter()
+        embeddings = query_embeddings
+        if embeddings is None:
+            embeddings = self.rag_system.embedder.encode(queries, batch_size=len(queries))
+        encode_ms = (time.perf_counter() - start_time) * 1000
+        
+        # Relevant chunks per source, the ideal ranking for nDCG
+        source_chunk_counts = {}
+        for metadata in self.rag_system.collection.get(include=['metadatas'])['metadatas']:
+            source = self._source_name(metadata['source_id'])
+            source_chunk_counts[source] = source_chunk_counts.get(source, 0) + 1
         
-        if not citations:
-            return 0.0
-        
-        # Check if answer contains information from citations
-        grounded_count = 0
-        total_topics = len(query_data['expected_topics'])
-        
-        # Check each expected topic
-        for expected_topic in query_data['expected_topics']:
-            topic_lower = expected_topic.lower()
+        results = []
+        latencies = []
+        skipped = 0
+        for query_data, embedding in zip(self.evaluation_queries, embeddings):
+            if not (query_data.get('relevant_sources') or query_data['expected_topics']):
+                skipped += 1
+                continue
+            start_time = time.perf_counter()
+            docs = self.rag_system._retrieve_documents(query_data['query'], embedding.tolist())
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            latencies.append(latency_ms)
             
-            # Topic must appear in answer
-            if topic_lower in answer:
-                # Check if this topic appears in any citation
-                for citation in citations:
-                    if topic_lower in citation['snippet'].lower():
-                        grounded_count += 1
-                        break
-        
-        # Score based on percentage of grounded topics
-        # This is more lenient than requiring all topics
-        return grounded_count / total_topics if total_topics > 0 else 0.0
-    
-    def _evaluate_citation_accuracy(self, response: Dict[str, Any], query_data: Dict[str, Any]) -> float:
-        """Evaluate citation accuracy using semantic similarity.
+            metrics = self._score_retrieval(docs, query_data, source_chunk_counts)
+            results.append({
+                'query': query_data['query'],
+                'category': query_data['category'],
+                'retrieved_sources': ';'.join(self._source_name(d['metadata']['source_id']) for d in docs),
+                'retrieved_chunks': len(docs),
+                # Nearest and farthest kept distances, for tuning the adaptive depth thresholds
+                'best_distance': docs[0]['distance'] if docs else None,
+                'worst_distance': docs[-1]['distance'] if docs else None,
+                'retrieval_latency_ms': latency_ms,
+                'prompt_tokens': estimate_tokens(self.rag_system._build_prompt(query_data['query'], docs)),
+                **metrics
+            })
+        
+        if skipped:
+            logger.warning(f"Skipped {skipped} queries without relevant_sources or expected_topics")
+        if not results:
+            raise ValueError("No evaluation query has relevant_sources or expected_topics to score against")
         
-        Improved approach:
-        - Uses semantic similarity instead of keyword overlap
-        - Recognizes synonyms and paraphrasing
-        - More realistic for real-world citation relevance
-        - Threshold of 0.5 (50% semantic similarity)
-        """
-        citations = response['citations']
+        summary = {
+            'total_queries': len(results),
+            'skipped_unlabeled': skipped,
+            'top_k': self.rag_system.top_k,
+            'recall_at_k': statistics.mean(r['recall_at_k'] for r in results),
+            'mrr': statistics.mean(r['reciprocal_rank'] for r in results),
+            'ndcg_at_k': statistics.mean(r['ndcg_at_k'] for r in results),
+            'mean_retrieved_chunks': statistics.mean(r['retrieved_chunks'] for r in results),
+            'batch_encode_ms': encode_ms,
+            'retrieval_latency_ms': summarize_latencies(latencies),
+            'prompt_tokens': {
+                'mean': statistics.mean(r['prompt_tokens'] for r in results),
+                'max': max(r['prompt_tokens'] for r in results)
+            },
+            'by_category': {}
+        }
+        for category in sorted({r['category'] for r in results}):
+            rows = [r for r in results if r['category'] == category]
+            summary['by_category'][category] = {
+                'recall_at_k': statistics.mean(r['recall_at_k'] for r in rows),
+                'mrr': statistics.mean(r['reciprocal_rank'] for r in rows),
+                'ndcg_at_k': statistics.mean(r['ndcg_at_k'] for r in rows)
+            }
         
-        if not citations:
-            return 0.0
+        if save:
+            results_dir = RESULTS_DIR
+            results_dir.mkdir(exist_ok=True)
+            pd.DataFrame(results).to_csv(results_dir / "retrieval_results.csv", index=False)
+            with open(results_dir / "retrieval_summary.json", 'w') as f:
+                json.dump(summary, f, indent=2)
+            logger.info(f"Retrieval evaluation complete, results saved to {results_dir}")
         
-        # # Stop words to filter out
-        # stop_words = {'the', 'is', 'are', 'what', 'how', 'do', 'does', 'can', 'i', 'my', 'for', 'to', 'a', 'an', 'of', 'in', 'on', 'at'}
-
-        # Encode the query once
-        query_embedding = self.embedder.encode(query_data['query'])
+        return summary
+    
+    def _score_retrieval(self, docs: List[Dict[str, Any]], query_data: Dict[str, Any],
+                         source_chunk_counts: Dict[str, int]) -> Dict[str, float]:
+        """Compute recall@k, reciprocal rank and nDCG@k for one ranked result list.
         
-        accurate_citations = 0
+        Adaptive depth can return more than top_k chunks; only the first top_k are scored.
+        """
+        k = self.rag_system.top_k
+        docs = docs[:k]
+        relevant_sources = query_data.get('relevant_sources')
+        
+        if relevant_sources:
+            # Binary relevance by source document
+            gains = [1.0 if self._source_name(d['metadata']['source_id']) in relevant_sources else 0.0
+                     for d in docs]
+            found = {self._source_name(d['metadata']['source_id']) for d in docs} & set(relevant_sources)
+            recall = len(found) / len(relevant_sources)
+            total_relevant = sum(source_chunk_counts.get(source, 0) for source in relevant_sources)
+            ideal = [1.0] * min(k, total_relevant)
+        else:
+            # Graded relevance: share of expected topics a chunk mentions
+            topics = [t.lower() for t in query_data['expected_topics']]
+            texts = [d['text'].lower() for d in docs]
+            gains = [sum(t in text for t in topics) / len(topics) for text in texts]
+            recall = sum(any(t in text for text in texts) for t in topics) / len(topics)
+            # Unlabeled queries have no known ideal ranking beyond what was retrieved
+            ideal = sorted(gains, reverse=True)
+        
+        reciprocal_rank = next((1.0 / rank for rank, gain in enumerate(gains, 1) if gain > 0), 0.0)
+        
+        dcg = sum(gain / math.log2(rank + 1) for rank, gain in enumerate(gains, 1))
+        idcg = sum(gain / math.log2(rank + 1) for rank, gain in enumerate(ideal, 1))
+        
+        return {
+            'recall_at_k': recall,
+            'reciprocal_rank': reciprocal_rank,
+            'ndcg_at_k': dcg / idcg if idcg > 0 else 0.0
+        }
+    
+    @staticmethod
+    def _source_name(source_id: str) -> str:
+        """File name of a chunk's source, independent of the path separator used at ingest."""
+        return source_id.replace('\\', '/').rsplit('/', 1)[-1]
+    
+    def _evaluate_groundedness(self, pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[float]:
+        """Evaluate if each answer is grounded in its retrieved documents.
         
-        for citation in citations:
-            # Encode the citation snippet
-            citation_embedding = self.embedder.encode(citation['snippet'])
-            
-            # Calculate semantic similarity
-            similarity = util.pytorch_cos_sim(query_embedding, citation_embedding)[0][0]
+        Takes (response, query_data) pairs. A topic counts as grounded when it appears
+        in the answer and in at least one citation; requiring 50% rather than 100% of
+        expected topics is more realistic for real-world RAG systems.
+        """
+        scores = []
+        for response, query_data in pairs:
+            topics = [topic.lower() for topic in query_data['expected_topics']]
+            if not response['citations'] or not topics:
+                scores.append(0.0)
+                continue
             
-            # Use 0.5 threshold (50% semantic similarity)
-            # This is more lenient than keyword matching but still meaningful
-            if similarity > 0.5:
-                accurate_citations += 1
+            answer = response['answer'].lower()
+            # One haystack per query; the separator keeps matches inside a single snippet
+            snippets = '\x00'.join(citation['snippet'].lower() for citation in response['citations'])
+            grounded_count = sum(1 for topic in topics if topic in answer and topic in snippets)
+            scores.append(grounded_count / len(topics))
         
-        return accurate_citations / len(citations) if citations else 0.0
+        return scores
+    
+    def _evaluate_citation_accuracy(self, pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[float]:
+        """Evaluate citation accuracy using semantic similarity.
+        
+        Takes (response, query_data) pairs. A citation is accurate when its snippet's
+        cosine similarity to the query exceeds 0.5, which recognizes synonyms and
+        paraphrasing. Queries and unique snippets of the whole run are encoded in one
+        batch and scored with a single vectorized similarity computation.
+        """
+        if not pairs:
+            return []
+        
+        queries = [query_data['query'] for _, query_data in pairs]
+        snippet_index = {}
+        owners = []
+        snippet_ids = []
+        for i, (response, _) in enumerate(pairs):
+            for citation in response['citations']:
+                owners.append(i)
+                snippet_ids.append(snippet_index.setdefault(citation['snippet'], len(snippet_index)))
+        
+        if not owners:
+            return [0.0] * len(pairs)
+        
+        query_embeddings = self._encode_normalized(queries)
+        snippet_embeddings = self._encode_normalized(list(snippet_index))
+        
+        # Cosine similarity of every citation with its own query
+        owners = np.array(owners)
+        similarities = np.einsum('ij,ij->i', query_embeddings[owners], snippet_embeddings[np.array(snippet_ids)])
+        
+        accurate = np.bincount(owners, weights=(similarities > 0.5), minlength=len(pairs))
+        counts = np.bincount(owners, minlength=len(pairs))
+        return np.divide(accurate, counts, out=np.zeros(len(pairs)), where=counts > 0).tolist()
+    
+    def _encode_normalized(self, texts: List[str]) -> np.ndarray:
+        """Batch-encode texts into unit-length rows."""
+        embeddings = np.asarray(self.embedder.encode(texts, batch_size=64, convert_to_numpy=True), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
     
     def _calculate_summary_metrics(self, results: List[Dict[str, Any]], latencies: List[float]) -> Dict[str, Any]:
         """Calculate summary evaluation metrics."""
@@ -301,11 +465,15 @@ class RAGEvaluator:
             },
             'latency_ms': {
                 'p50': statistics.median(latencies),
-                'p95': self._percentile(latencies, 95),
+                'p95': percentile(latencies, 95),
                 'mean': statistics.mean(latencies),
                 'min': min(latencies),
                 'max': max(latencies)
             },
+            'rate_limit_wait_ms': {
+                'mean': statistics.mean(r['rate_limit_wait_ms'] for r in results),
+                'max': max(r['rate_limit_wait_ms'] for r in results)
+            },
             'retrieval_stats': {
                 'avg_sources': statistics.mean([r['sources_count'] for r in results]),
                 'avg_citations': statistics.mean([r['citations_count'] for r in results]),
@@ -315,22 +483,10 @@ class RAGEvaluator:
         
         return summary
     
-    def _percentile(self, data: List[float], percentile: int) -> float:
-        """Calculate percentile of a dataset."""
-        sorted_data = sorted(data)
-        index = (percentile / 100) * (len(sorted_data) - 1)
-        
-        if index.is_integer():
-            return sorted_data[int(index)]
-        else:
-            lower = sorted_data[int(index)]
-            upper = sorted_data[int(index) + 1]
-            return lower + (upper - lower) * (index - int(index))
-    
     def _save_results(self, results: List[Dict[str, Any]], summary: Dict[str, Any]):
         """Save evaluation results to files."""
         # Create results directory
-        results_dir = Path("evaluation_results")
+        results_dir = RESULTS_DIR
         results_dir.mkdir(exist_ok=True)
         
         # Save detailed results
@@ -345,7 +501,11 @@ class RAGEvaluator:
     
     def _generate_visualizations(self, results: List[Dict[str, Any]]):
         """Generate evaluation visualizations."""
-        results_dir = Path("evaluation_results")
+        # Plotting libraries are slow to import and only needed here
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
+        results_dir = RESULTS_DIR
         results_dir.mkdir(exist_ok=True)
         
         df = pd.DataFrame(results)
@@ -405,7 +565,7 @@ class RAGEvaluator:
         report.append(f"Average Groundedness: {df['groundedness_score'].mean():.3f}")
         report.append(f"Average Citation Accuracy: {df['citation_accuracy_score'].mean():.3f}")
         report.append(f"Median Latency: {df['latency_ms'].median():.1f}ms")
-        report.append(f"95th Percentile Latency: {self._percentile(df['latency_ms'].tolist(), 95):.1f}ms")
+        report.append(f"95th Percentile Latency: {percentile(df['latency_ms'].tolist(), 95):.1f}ms")
         report.append("")
         
         # Category breakdown
@@ -438,24 +598,79 @@ class RAGEvaluator:
             f.write('\n'.join(report))
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Run evaluation."""
+    parser = argparse.ArgumentParser(description='Evaluate the RAG system')
+    parser.add_argument('--mode', choices=['full', 'retrieval', 'report'], default='full',
+                        help='full: generate and score answers; retrieval: retrieval metrics only, no LLM calls; '
+                             'report: recompute summary and charts from evaluation_results/results.jsonl')
+    parser.add_argument('--resume', action='store_true',
+                        help='Keep the results log and skip queries that already completed successfully')
+    parser.add_argument('--top-k', type=int, default=5, help='Chunks retrieved per query')
+    parser.add_argument('--queries', type=Path, default=DEFAULT_QUERIES_PATH,
+                        help='JSONL evaluation set (default: evaluation/queries.jsonl)')
+    parser.add_argument('--parallelism', type=int, default=4, help='Queries evaluated concurrently')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='Attempts per query before it is reported as failed')
+    parser.add_argument('--rate-limit-rpm', type=float,
+                        help='OpenRouter requests per minute (default: OPENROUTER_RATE_LIMIT_RPM)')
+    parser.add_argument('--cassette', choices=['record', 'replay', 'auto'],
+                        help='Record LLM responses to, or replay them from, --cassette-dir (default: LLM_CASSETTE_MODE)')
+    parser.add_argument('--cassette-dir', default=os.getenv("LLM_CASSETTE_DIR", "./cassettes"),
+                        help='Directory holding recorded LLM responses')
+    
+    args = parser.parse_args(argv)
+    
     try:
-        # Initialize RAG system
-        rag_system = RAGSystem()
-        
-        # Run evaluation
-        evaluator = RAGEvaluator(rag_system)
-        summary = evaluator.run_full_evaluation()
+        if args.mode == 'retrieval':
+            rag_system = RAGSystem(top_k=args.top_k, require_llm=False)
+            summary = RAGEvaluator(rag_system, args.queries).run_retrieval_evaluation()
+            
+            print("\nRETRIEVAL EVALUATION SUMMARY:")
+            print("=" * 50)
+            print(f"Total Queries: {summary['total_queries']}")
+            if summary['skipped_unlabeled']:
+                print(f"Skipped (unlabeled): {summary['skipped_unlabeled']}")
+            print(f"Recall@{summary['top_k']}: {summary['recall_at_k']:.3f}")
+            print(f"MRR: {summary['mrr']:.3f}")
+            print(f"nDCG@{summary['top_k']}: {summary['ndcg_at_k']:.3f}")
+            print(f"Avg Prompt Tokens (est.): {summary['prompt_tokens']['mean']:.0f}")
+            print(f"Batch Encode: {summary['batch_encode_ms']:.1f}ms")
+            print(f"Median Retrieval Latency: {summary['retrieval_latency_ms']['p50']:.1f}ms")
+            print(f"95th Percentile Retrieval Latency: {summary['retrieval_latency_ms']['p95']:.1f}ms")
+            return
+        
+        if args.mode == 'report':
+            # Scoring only needs the log and the embedding model
+            summary = RAGEvaluator(None, args.queries).summarize_results()
+        else:
+            # Initialize RAG system
+            rate_limiter = None
+            if args.rate_limit_rpm is not None:
+                rate_limiter = TokenBucket(
+                    name=bucket_name(),
+                    rate_per_minute=args.rate_limit_rpm,
+                    burst=int(os.getenv("OPENROUTER_RATE_LIMIT_BURST", "5")),
+                    db_path=os.getenv("OPENROUTER_RATE_LIMIT_DB", "./.rate_limit.sqlite3")
+                )
+            cassette = LLMCassette(args.cassette_dir, args.cassette) if args.cassette else None
+            rag_system = RAGSystem(top_k=args.top_k, rate_limiter=rate_limiter, cassette=cassette)
+            
+            # Run evaluation
+            evaluator = RAGEvaluator(rag_system, args.queries)
+            summary = evaluator.run_full_evaluation(parallelism=args.parallelism, max_attempts=args.max_attempts,
+                                                    resume=args.resume)
         
         # Print summary
         print("\nEVALUATION SUMMARY:")
         print("=" * 50)
         print(f"Total Queries: {summary['total_queries']}")
+        print(f"Failed Queries: {len(summary['failed_queries'])}")
         print(f"Average Groundedness: {summary['groundedness']['mean']:.3f}")
         print(f"Average Citation Accuracy: {summary['citation_accuracy']['mean']:.3f}")
         print(f"Median Latency: {summary['latency_ms']['p50']:.1f}ms")
         print(f"95th Percentile Latency: {summary['latency_ms']['p95']:.1f}ms")
+        print(f"Average Rate Limit Wait: {summary['rate_limit_wait_ms']['mean']:.1f}ms")
         
     except Exception as e:
         logger.error(f"Evaluation failed: {e}")
@@ -463,4 +678,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Extractive answers without the LLM.
+Splits the retrieved chunks into sentences, embeds them in one batch and returns the
+sentences closest to the query embedding, each with its [Source: filename] citation.
+RAGSystem uses it when OpenRouter fails (degraded mode) or when retrieval is confident
+enough that generation adds little.
+"""
+
+import re
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+# Markdown headings, list bullets and numbering in front of a sentence
+LINE_MARKUP = re.compile(r'^\s*(?:#+|[-*+]|\d+[.)])\s+')
+
+
+def split_sentences(text: str, min_chars: int = 25) -> List[str]:
+    """Sentences and list items of a chunk, without markdown markup; fragments are dropped."""
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(text):
+        sentence = LINE_MARKUP.sub('', part).replace('**', '').strip()
+        if len(sentence) >= min_chars:
+            sentences.append(sentence)
+    return sentences
+
+
+def source_filename(source_id: str) -> str:
+    """File name of a source path, for either path separator."""
+    return source_id.split('/')[-1].split('\\')[-1]
+
+
+class ExtractiveAnswerer:
+    """Answers with the retrieved sentences most similar to the question."""
+
+    def __init__(self, embedder, max_sentences: int = 3, min_similarity: float = 0.3):
+        """Initialize answerer.
+
+        Args:
+            embedder: SentenceTransformer used for the query embeddings
+            max_sentences: Most sentences in an answer
+            min_similarity: Cosine similarity a sentence needs to be used
+        """
+        self.embedder = embedder
+        self.max_sentences = max_sentences
+        self.min_similarity = min_similarity
+
+    def answer(self, query_embedding: List[float], docs: List[Dict[str, Any]]) -> Optional[str]:
+        """Best-matching sentences with citations, most relevant first; None when none is close enough."""
+        sentences = {}
+        for doc in docs:
+            for sentence in split_sentences(doc['text']):
+                # Overlapping chunks repeat sentences; keep the first (best-ranked) occurrence
+                sentences.setdefault(sentence, doc['metadata']['source_id'])
+        if not sentences:
+            return None
+
+        texts = list(sentences)
+        embeddings = np.asarray(self.embedder.encode(texts, batch_size=64, normalize_embeddings=True))
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = embeddings @ (query / (np.linalg.norm(query) or 1.0))
+
+        best = [i for i in np.argsort(-scores)[:self.max_sentences] if scores[i] >= self.min_similarity]
+        if not best:
+            logger.info(f"No sentence within similarity {self.min_similarity} (best {scores.max():.3f})")
+            return None
+        return ' '.join(f"{texts[i]} [Source: {source_filename(sentences[texts[i]])}]" for i in best)
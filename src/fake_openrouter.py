@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter chat completions API.
+Serves /api/v1/chat/completions (including streaming) with configurable latency,
+token rate and 429 injection so the RAG system can be exercised offline.
+
+Point the RAG system at it with:
+    OPENROUTER_BASE_URL=http://localhost:8001/api/v1 OPENROUTER_API_KEY=fake python app.py
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from flask import Flask, Response, request, jsonify
+from werkzeug.serving import make_server
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+class FakeLLMBehavior:
+    """Latency, throughput and failure behaviour of the fake LLM endpoint."""
+
+    def __init__(
+        self,
+        latency_ms: float = 500.0,
+        latency_jitter_ms: float = 0.0,
+        latency_distribution: str = 'fixed',
+        tokens_per_second: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        rate_limit_rpm: int = 0,
+        seed: Optional[int] = None
+    ):
+        """Initialize behaviour.
+
+        Args:
+            latency_ms: Time to first token (median for lognormal)
+            latency_jitter_ms: Spread around latency_ms (half-width for uniform, sigma scale for lognormal)
+            latency_distribution: One of 'fixed', 'uniform' or 'lognormal'
+            tokens_per_second: Generation speed after the first token, 0 for instant
+            rate_limit_probability: Fraction of requests answered with 429
+            rate_limit_rpm: Requests per minute allowed before answering 429, 0 for unlimited
+            seed: Random seed for reproducible latency and failure sequences
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_probability = rate_limit_probability
+        self.rate_limit_rpm = rate_limit_rpm
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent_requests = deque()
+
+    def sample_latency(self) -> float:
+        """Sample time to first token in seconds."""
+        with self._lock:
+            if self.latency_distribution == 'uniform':
+                latency = self._random.uniform(
+                    self.latency_ms - self.latency_jitter_ms,
+                    self.latency_ms + self.latency_jitter_ms
+                )
+            elif self.latency_distribution == 'lognormal' and self.latency_ms > 0:
+                sigma = self.latency_jitter_ms / self.latency_ms if self.latency_jitter_ms else 0.5
+                latency = self.latency_ms * self._random.lognormvariate(0, sigma)
+            else:
+                latency = self.latency_ms
+        return max(latency, 0.0) / 1000
+
+    def token_delay(self) -> float:
+        """Seconds between generated tokens."""
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def should_rate_limit(self) -> bool:
+        """Decide whether this request is rejected with 429."""
+        with self._lock:
+            if self.rate_limit_rpm:
+                now = time.monotonic()
+                while self._recent_requests and now - self._recent_requests[0] > 60:
+                    self._recent_requests.popleft()
+                if len(self._recent_requests) >= self.rate_limit_rpm:
+                    return True
+                self._recent_requests.append(now)
+
+            return self._random.random() < self.rate_limit_probability
+
+
+def build_answer(messages: List[Dict[str, Any]], max_tokens: int) -> List[str]:
+    """Build a deterministic, citation-bearing answer from the prompt as a list of tokens."""
+    prompt = messages[-1].get('content', '') if messages else ''
+
+    # Reuse the first retrieved document so answers stay grounded in the context
+    sources = re.findall(r'\(from ([^)]+)\)\n(.*)', prompt)
+    if sources:
+        source_path, first_line = sources[0]
+        filename = source_path.split('/')[-1].split('\\')[-1]
+        text = f"According to the company policies, {first_line.strip()} [Source: {filename}]"
+    else:
+        text = "Hello, I am a local test model."
+
+    tokens = [word + ' ' for word in text.split()]
+    return tokens[:max_tokens] if max_tokens else tokens
+
+
+def create_app(behavior: Optional[FakeLLMBehavior] = None) -> Flask:
+    """Create the fake OpenRouter Flask app."""
+    behavior = behavior or FakeLLMBehavior()
+    app = Flask(__name__)
+    app.config['behavior'] = behavior
+
+    @app.route('/api/v1/models')
+    def models():
+        """List the single fake model."""
+        return jsonify({'data': [{
+            'id': 'fake/local-model:free',
+            'name': 'Local fake model',
+            'context_length': 8192,
+            'pricing': {'prompt': '0', 'completion': '0'}
+        }]})
+
+    @app.route('/api/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        """Mimic the OpenRouter chat completions endpoint."""
+        data = request.get_json(silent=True) or {}
+        if not data.get('messages'):
+            return jsonify({'error': {'message': 'messages is required', 'code': 400}}), 400
+
+        if behavior.should_rate_limit():
+            response = jsonify({'error': {'message': 'Rate limit exceeded: free-models-per-min', 'code': 429}})
+            response.headers['Retry-After'] = '1'
+            return response, 429
+
+        model = data.get('model', 'fake/local-model:free')
+        tokens = build_answer(data['messages'], data.get('max_tokens', 0))
+        prompt_tokens = sum(len(m.get('content', '').split()) for m in data['messages'])
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(tokens),
+            'total_tokens': prompt_tokens + len(tokens)
+        }
+        completion_id = f"gen-{uuid.uuid4().hex[:16]}"
+
+        if data.get('stream'):
+            return Response(
+                _stream_completion(behavior, completion_id, model, tokens, usage),
+                mimetype='text/event-stream'
+            )
+
+        time.sleep(behavior.sample_latency() + behavior.token_delay() * len(tokens))
+        return jsonify({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(tokens).strip()},
+                'finish_reason': 'stop'
+            }],
+            'usage': usage
+        })
+
+    return app
+
+
+def _stream_completion(behavior: FakeLLMBehavior, completion_id: str, model: str,
+                       tokens: List[str], usage: Dict[str, int]):
+    """Yield server-sent events in the OpenAI/OpenRouter streaming format."""
+    time.sleep(behavior.sample_latency())
+    delay = behavior.token_delay()
+
+    for i, token in enumerate(tokens):
+        if i and delay:
+            time.sleep(delay)
+        chunk = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+
+    final = {
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+        'usage': usage
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def start_in_thread(behavior: Optional[FakeLLMBehavior] = None,
+                    host: str = '127.0.0.1', port: int = 0) -> Tuple[Any, str]:
+    """Start the fake server in a daemon thread and return (server, base_url)."""
+    server = make_server(host, port, create_app(behavior), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_port}/api/v1"
+
+
+def main():
+    """Run the fake OpenRouter server."""
+    parser = argparse.ArgumentParser(description='Local fake OpenRouter server')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8001, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=500.0, help='Time to first token in milliseconds')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help='Latency spread in milliseconds')
+    parser.add_argument('--latency-distribution', choices=LATENCY_DISTRIBUTIONS, default='fixed',
+                        help='Latency distribution')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help='Generation speed, 0 for instant')
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--rate-limit-rpm', type=int, default=0, help='Requests per minute before 429, 0 for unlimited')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+
+    args = parser.parse_args()
+
+    behavior = FakeLLMBehavior(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        latency_distribution=args.latency_distribution,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_probability=args.rate_limit_probability,
+        rate_limit_rpm=args.rate_limit_rpm,
+        seed=args.seed
+    )
+
+    logger.info(f"Fake OpenRouter listening on http://{args.host}:{args.port}/api/v1")
+    server = make_server(args.host, args.port, create_app(behavior), threaded=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,10 @@ import os
 import argparse
 import logging
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import hashlib
 
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
@@ -19,6 +20,13 @@ from bs4 import BeautifulSoup
 import PyPDF2
 from docx import Document
 
+try:
+    from src.aliases import AliasRegistry, DEFAULT_ALIAS, versioned_name, parents_name
+    from src.shards import SHARD_LAYOUTS, shard_for, shard_alias, shard_persist_dir
+except ImportError:
+    from aliases import AliasRegistry, DEFAULT_ALIAS, versioned_name, parents_name
+    from shards import SHARD_LAYOUTS, shard_for, shard_alias, shard_persist_dir
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -191,6 +199,54 @@ class TextChunker:
         return text[-self.overlap:]
 
 
+class ParentChildChunker:
+    """Two-level chunking for small-to-big retrieval.
+
+    Documents are split into parent sections, and each parent into small child passages.
+    Children are embedded and searched; a hit is expanded to its parent at query time.
+    """
+    
+    def __init__(self, parent_size: int = 1000, parent_overlap: int = 200,
+                 child_size: int = 250, child_overlap: int = 50):
+        """Initialize chunker.
+
+        Args:
+            parent_size: Target size of the sections returned as context
+            parent_overlap: Overlap between parent sections
+            child_size: Target size of the passages that are embedded and searched
+            child_overlap: Overlap between passages of the same parent
+        """
+        self.parent_chunker = TextChunker(chunk_size=parent_size, overlap=parent_overlap)
+        self.child_chunker = TextChunker(chunk_size=child_size, overlap=child_overlap)
+    
+    def chunk_document(self, document: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split document into parent sections and their child passages."""
+        parents = self.parent_chunker.chunk_document(document)
+        children = []
+        for parent in parents:
+            passages = self.child_chunker.chunk_document({**document, 'content': parent['text']})
+            for i, passage in enumerate(passages):
+                # Passage text can repeat across overlapping parents, so ids derive from the parent
+                passage['id'] = f"{parent['id']}_c{i}"
+                passage['chunk_id'] = parent['chunk_id']
+                passage['parent_id'] = parent['id']
+                children.append(passage)
+        return parents, children
+
+
+def embed_parents(parents: List[Dict[str, Any]], children: List[Dict[str, Any]],
+                      child_embeddings: List[List[float]]) -> List[List[float]]:
+    """Embed each parent as the normalized mean of its children's embeddings (no extra model pass)."""
+    rows = {}
+    for child, embedding in zip(children, child_embeddings):
+        rows.setdefault(child['parent_id'], []).append(embedding)
+    embeddings = []
+    for parent in parents:
+        mean = np.mean(rows[parent['id']], axis=0)
+        embeddings.append((mean / (np.linalg.norm(mean) or 1.0)).tolist())
+    return embeddings
+
+
 class EmbeddingGenerator:
     """Generates embeddings using sentence transformers."""
     
@@ -205,25 +261,48 @@ class EmbeddingGenerator:
         return embeddings.tolist()
 
 
+HNSW_SPACES = ('l2', 'cosine', 'ip')
+
+
+def hnsw_metadata(space: Optional[str] = None, m: Optional[int] = None,
+                  construction_ef: Optional[int] = None, search_ef: Optional[int] = None) -> Dict[str, Any]:
+    """Chroma collection metadata for HNSW settings; unset values keep Chroma's defaults
+    (l2 space, M=16, construction_ef=100, search_ef=100)."""
+    settings = {
+        'hnsw:space': space,
+        'hnsw:M': m,
+        'hnsw:construction_ef': construction_ef,
+        'hnsw:search_ef': search_ef
+    }
+    return {key: value for key, value in settings.items() if value is not None}
+
+
 class ChromaDBManager:
     """Manages Chroma vector database operations."""
     
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(self, persist_directory: str = "./chroma_db", collection_name: str = DEFAULT_ALIAS,
+                 metadata: Optional[Dict[str, Any]] = None, exist_ok: bool = True):
+        """Open the collection, creating it if needed; with exist_ok False, fail if it already exists."""
         self.persist_directory = persist_directory
         self.client = chromadb.PersistentClient(
             path=persist_directory,
             settings=Settings(anonymized_telemetry=False)
         )
-        self.collection_name = "company_policies"
+        self.collection_name = collection_name
         
         # Create or get collection
-        try:
-            self.collection = self.client.get_collection(self.collection_name)
-            logger.info(f"Using existing collection: {self.collection_name}")
-        except:
+        self.collection = None
+        if exist_ok:
+            try:
+                self.collection = self.client.get_collection(self.collection_name)
+                logger.info(f"Using existing collection: {self.collection_name}")
+            except:
+                pass
+        if self.collection is None:
+            # Raises if the collection exists, so nothing is added to it
             self.collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "Company policies and procedures"}
+                metadata={"description": "Company policies and procedures", **(metadata or {})}
             )
             logger.info(f"Created new collection: {self.collection_name}")
     
@@ -235,7 +314,8 @@ class ChromaDBManager:
             'source_id': chunk['source_id'],
             'title': chunk['title'],
             'chunk_id': chunk['chunk_id'],
-            'file_type': chunk['file_type']
+            'file_type': chunk['file_type'],
+            **({'parent_id': chunk['parent_id']} if 'parent_id' in chunk else {})
         } for chunk in chunks]
         
         logger.info(f"Adding {len(chunks)} chunks to collection")
@@ -255,22 +335,93 @@ class ChromaDBManager:
         }
 
 
-def main():
+def store_version(persist_dir: str, alias: str, chunks: List[Dict[str, Any]], embeddings: List[List[float]],
+                  params: Dict[str, Any], activate: bool = True,
+                  parents: Optional[List[Dict[str, Any]]] = None,
+                  parent_embeddings: Optional[List[List[float]]] = None) -> str:
+    """Store chunks as a new collection version for alias, optionally switching the alias to it.
+    
+    With parents (small-to-big), the chunks are child passages and the parent sections go
+    to a companion collection named in the version's `parents_collection` metadata.
+    A version is never written into an existing collection: if its name is taken, this raises.
+    """
+    name = versioned_name(alias, params)
+    metadata = {**params, 'alias': alias}
+    if parents is not None:
+        parents_manager = ChromaDBManager(
+            persist_directory=persist_dir,
+            collection_name=parents_name(name),
+            metadata={**params, 'alias': alias, 'children_collection': name},
+            exist_ok=False
+        )
+        if parents:
+            parents_manager.add_chunks(parents, parent_embeddings)
+        metadata['parents_collection'] = parents_name(name)
+    
+    db_manager = ChromaDBManager(
+        persist_directory=persist_dir,
+        collection_name=name,
+        metadata=metadata,
+        exist_ok=False
+    )
+    if chunks:
+        db_manager.add_chunks(chunks, embeddings)
+    
+    stats = db_manager.get_collection_stats()
+    logger.info(f"Collection: {stats['collection_name']} ({stats['total_chunks']} chunks)")
+    
+    if not activate:
+        logger.info(f"Alias '{alias}' unchanged; activate with: "
+                    f"python -m src.cli collections --persist-dir {persist_dir} --alias {alias} "
+                    f"activate {stats['collection_name']}")
+    else:
+        existing = {collection.name for collection in db_manager.client.list_collections()}
+        previous = AliasRegistry(persist_dir).activate(alias, stats['collection_name'], existing)
+        if previous:
+            logger.info(f"Alias '{alias}' now serves {stats['collection_name']} (roll back to {previous} with: "
+                        f"python -m src.cli collections --persist-dir {persist_dir} --alias {alias} rollback)")
+        else:
+            logger.info(f"Alias '{alias}' now serves {stats['collection_name']}")
+    return stats['collection_name']
+
+
+def main(argv: Optional[List[str]] = None):
     """Main ingestion pipeline."""
     parser = argparse.ArgumentParser(description='Ingest documents for RAG system')
     parser.add_argument('--corpus', required=True, help='Path to corpus directory')
     parser.add_argument('--chunk-size', type=int, default=1000, help='Chunk size in characters')
     parser.add_argument('--overlap', type=int, default=200, help='Overlap size in characters')
+    parser.add_argument('--child-chunk-size', type=int, default=0,
+                        help='Search small passages of this size and return their --chunk-size parents (0: off)')
+    parser.add_argument('--child-overlap', type=int, default=50, help='Overlap between child passages in characters')
     parser.add_argument('--embedding-model', default='all-MiniLM-L6-v2', help='Embedding model name')
     parser.add_argument('--persist-dir', default='./chroma_db', help='Chroma persistence directory')
+    parser.add_argument('--space', choices=HNSW_SPACES, help='Distance space (default: l2)')
+    parser.add_argument('--hnsw-m', type=int, help='HNSW links per node (default: 16)')
+    parser.add_argument('--hnsw-construction-ef', type=int, help='HNSW build-time candidate list (default: 100)')
+    parser.add_argument('--hnsw-search-ef', type=int,
+                        help='HNSW query-time candidate list (default: 100, change later with collections activate --hnsw-search-ef)')
+    parser.add_argument('--alias', default=DEFAULT_ALIAS, help='Alias the new collection version is built for')
+    parser.add_argument('--no-activate', action='store_true',
+                        help='Build the new version without pointing the alias at it')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Partition documents by department into this many shards (RAG_SHARDS at serving)')
+    parser.add_argument('--shard', type=int, action='append',
+                        help='Rebuild only this shard (repeatable); other shards are left untouched')
+    parser.add_argument('--shard-layout', choices=SHARD_LAYOUTS, default='collections',
+                        help='Shards as collections in --persist-dir, or one directory each under it')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.shard and not all(0 <= shard < args.shards for shard in args.shard):
+        parser.error(f"--shard must be between 0 and {args.shards - 1} for --shards {args.shards}")
     
     # Initialize components
     processor = DocumentProcessor()
     chunker = TextChunker(chunk_size=args.chunk_size, overlap=args.overlap)
+    if args.child_chunk_size:
+        chunker = ParentChildChunker(parent_size=args.chunk_size, parent_overlap=args.overlap,
+                                     child_size=args.child_chunk_size, child_overlap=args.child_overlap)
     embedder = EmbeddingGenerator(model_name=args.embedding_model)
-    db_manager = ChromaDBManager(persist_directory=args.persist_dir)
     
     # Process documents
     corpus_path = Path(args.corpus)
@@ -278,17 +429,30 @@ def main():
         logger.error(f"Corpus directory not found: {corpus_path}")
         return
     
+    selected_shards = set(args.shard or range(args.shards))
     all_chunks = []
+    chunk_shards = []
+    all_parents = []
+    parent_shards = []
     processed_files = 0
     
     for file_path in corpus_path.rglob('*'):
         if file_path.is_file() and file_path.suffix.lower() in processor.supported_extensions:
+            shard = shard_for(file_path, corpus_path, args.shards)
+            if shard not in selected_shards:
+                continue
+            
             logger.info(f"Processing: {file_path}")
             document = processor.process_file(file_path)
             
             if document:
                 chunks = chunker.chunk_document(document)
+                if args.child_chunk_size:
+                    parents, chunks = chunks
+                    all_parents.extend(parents)
+                    parent_shards.extend([shard] * len(parents))
                 all_chunks.extend(chunks)
+                chunk_shards.extend([shard] * len(chunks))
                 processed_files += 1
                 logger.info(f"Created {len(chunks)} chunks from {file_path}")
     
@@ -299,16 +463,43 @@ def main():
     # Generate embeddings
     texts = [chunk['text'] for chunk in all_chunks]
     embeddings = embedder.generate_embeddings(texts)
+    parent_embeddings = None
+    if args.child_chunk_size:
+        parent_embeddings = embed_parents(all_parents, all_chunks, embeddings)
     
-    # Store in Chroma
-    db_manager.add_chunks(all_chunks, embeddings)
+    # Store in a new collection version, leaving the live one untouched until the swap
+    params = {
+        'embedding_model': args.embedding_model,
+        'chunk_size': args.chunk_size,
+        'overlap': args.overlap,
+        **hnsw_metadata(args.space, args.hnsw_m, args.hnsw_construction_ef, args.hnsw_search_ef)
+    }
+    if args.child_chunk_size:
+        params['child_chunk_size'] = args.child_chunk_size
+        params['child_overlap'] = args.child_overlap
+    if args.shards <= 1:
+        store_version(args.persist_dir, args.alias, all_chunks, embeddings, params, not args.no_activate,
+                      all_parents if args.child_chunk_size else None, parent_embeddings)
+    else:
+        # Each shard is its own versioned alias, so rebuilding one leaves the others live as they are
+        params['shards'] = args.shards
+        # Shards without documents still get an (empty) version so serving can open every shard
+        for shard in sorted(selected_shards):
+            rows = [i for i, chunk_shard in enumerate(chunk_shards) if chunk_shard == shard]
+            parent_rows = [i for i, parent_shard in enumerate(parent_shards) if parent_shard == shard]
+            store_version(shard_persist_dir(args.persist_dir, shard, args.shard_layout),
+                          shard_alias(args.alias, shard),
+                          [all_chunks[i] for i in rows], [embeddings[i] for i in rows],
+                          params, not args.no_activate,
+                          [all_parents[i] for i in parent_rows] if args.child_chunk_size else None,
+                          [parent_embeddings[i] for i in parent_rows] if args.child_chunk_size else None)
     
     # Print statistics
-    stats = db_manager.get_collection_stats()
     logger.info(f"Ingestion complete!")
     logger.info(f"Processed files: {processed_files}")
-    logger.info(f"Total chunks: {stats['total_chunks']}")
-    logger.info(f"Collection: {stats['collection_name']}")
+    logger.info(f"Total chunks: {len(all_chunks)}")
+    if args.child_chunk_size:
+        logger.info(f"Parent sections: {len(all_parents)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Latency statistics helpers shared by load tests, benchmarks and evaluation.
+"""
+
+import statistics
+from typing import List, Dict
+
+
+def percentile(data: List[float], percentile: float) -> float:
+    """Calculate percentile of a dataset using linear interpolation."""
+    sorted_data = sorted(data)
+    if not sorted_data:
+        return 0.0
+
+    index = (percentile / 100) * (len(sorted_data) - 1)
+    lower = sorted_data[int(index)]
+    if index.is_integer():
+        return lower
+
+    upper = sorted_data[int(index) + 1]
+    return lower + (upper - lower) * (index - int(index))
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict[str, float]:
+    """Summarize a list of latencies in milliseconds."""
+    if not latencies_ms:
+        return {'count': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0, 'min': 0.0, 'max': 0.0}
+
+    return {
+        'count': len(latencies_ms),
+        'p50': percentile(latencies_ms, 50),
+        'p95': percentile(latencies_ms, 95),
+        'p99': percentile(latencies_ms, 99),
+        'mean': statistics.mean(latencies_ms),
+        'min': min(latencies_ms),
+        'max': max(latencies_ms)
+    }
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""List available free models on OpenRouter."""
+
+import os
+import argparse
+from typing import List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+
+def main(argv: Optional[List[str]] = None):
+    """Print free OpenRouter models."""
+    parser = argparse.ArgumentParser(description='List free OpenRouter models')
+    parser.add_argument('--limit', type=int, default=15, help='Models to show (0 for all)')
+
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+    print("Fetching available models from OpenRouter...")
+    print()
+
+    try:
+        response = requests.get(
+            f"{base_url.rstrip('/')}/models",
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=10
+        )
+
+        if response.status_code != 200:
+            print(f"Error: {response.status_code}")
+            print(response.text)
+            return 1
+
+        models = response.json()['data']
+
+        # Filter for free models
+        free_models = [m for m in models if m.get('pricing', {}).get('prompt', '0') == '0']
+
+        print(f"Found {len(free_models)} free models:\n")
+
+        for model in free_models[:args.limit or None]:
+            model_id = model['id']
+            name = model.get('name', 'Unknown')
+            context = model.get('context_length', 'Unknown')
+            print(f"  {model_id}")
+            print(f"    Name: {name}")
+            print(f"    Context: {context}")
+            print()
+        return 0
+
+    except Exception as e:
+        print(f"Exception: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+On-demand request profiling.
+Captures a cProfile of a single RAGSystem.query call, triggered by an admin-token
+guarded request header or by sampling 1-in-N requests, and writes it as a .prof
+file (pstats format, readable by snakeviz, flameprof and gprof2dot) into a
+rotating directory.
+
+cProfile only sees the thread that calls the profiled function. While a request is
+profiled, the query embedding batcher and the shard fan-out run inline on that thread
+(see profiling_active()), so their work shows up in the profile, at the cost of the
+batching wait and shard parallelism being absent from it. Background threads (query
+log writer, cache warmer, other requests) are never included.
+"""
+
+import os
+import hmac
+import time
+import cProfile
+import itertools
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marks the thread running a profiled call
+_profiled = threading.local()
+
+
+def profiling_active() -> bool:
+    """Whether the calling thread is inside a profiled call and should keep its work on this thread."""
+    return getattr(_profiled, 'active', False)
+
+
+class RequestProfiler:
+    """Profiles selected requests and keeps the newest profiles on disk."""
+
+    def __init__(
+        self,
+        output_dir: str = "./profiles",
+        admin_token: Optional[str] = None,
+        sample_every: int = 0,
+        max_profiles: int = 50
+    ):
+        """Initialize profiler.
+
+        Args:
+            output_dir: Directory for .prof files
+            admin_token: Token required in X-Admin-Token to profile on request, None disables the header
+            sample_every: Profile one in every N requests, 0 disables sampling
+            max_profiles: Number of newest profiles to keep
+        """
+        self.output_dir = Path(output_dir)
+        self.admin_token = admin_token
+        self.sample_every = sample_every
+        self.max_profiles = max_profiles
+        self.enabled = bool(admin_token) or sample_every > 0
+
+        self._counter = itertools.count(1)
+        # cProfile cannot run two profilers at once, so concurrent candidates are skipped
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RequestProfiler':
+        """Create a profiler configured from environment variables."""
+        return cls(
+            output_dir=os.getenv("RAG_PROFILE_DIR", "./profiles"),
+            admin_token=os.getenv("RAG_ADMIN_TOKEN") or None,
+            sample_every=int(os.getenv("RAG_PROFILE_SAMPLE_EVERY", "0")),
+            max_profiles=int(os.getenv("RAG_PROFILE_MAX_FILES", "50"))
+        )
+
+    def should_profile(self, headers) -> bool:
+        """Decide whether the current request is profiled."""
+        if self.admin_token and headers.get('X-Profile') == '1':
+            token = headers.get('X-Admin-Token', '')
+            if hmac.compare_digest(token, self.admin_token):
+                return True
+            logger.warning("Profiling requested with an invalid admin token")
+
+        return self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+
+    def run(self, func: Callable, *args, label: str = "query", **kwargs) -> Tuple[Any, Optional[str]]:
+        """Call func under cProfile and return (result, profile filename or None)."""
+        if not self._lock.acquire(blocking=False):
+            return func(*args, **kwargs), None
+
+        try:
+            profiler = cProfile.Profile()
+            _profiled.active = True
+            profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                _profiled.active = False
+
+            filename = self._save(profiler, label)
+            return result, filename
+        finally:
+            self._lock.release()
+
+    def _save(self, profiler: cProfile.Profile, label: str) -> Optional[str]:
+        """Write the profile and drop the oldest ones beyond max_profiles."""
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+            path = self.output_dir / f"{timestamp}_{label}_{os.getpid()}.prof"
+            profiler.dump_stats(str(path))
+            logger.info(f"Saved request profile: {path}")
+
+            profiles = sorted(self.output_dir.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+            for old in profiles[:-self.max_profiles]:
+                old.unlink(missing_ok=True)
+
+            return path.name
+        except Exception as e:
+            logger.error(f"Failed to save profile: {e}")
+            return None
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Structured query log.
+Each answered /chat request is recorded as one JSON line: question, normalized key,
+retrieved chunk ids and distances, per-stage timings, model, answer mode and cache
+hit/miss. A background thread writes records in batches to a size-rotated JSONL file
+(queries.jsonl, queries.jsonl.1, ...), so logging never blocks the request path; when
+the writer falls behind, records are dropped and counted instead.
+
+The analysis command summarizes top questions, latency percentiles and cache hit
+ratios over time:
+    python -m src.cli querylog --path query_logs/queries.jsonl --bucket hour
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+try:
+    from src.cache import normalize_question
+    from src.metrics import REGISTRY
+    from src.latency import summarize_latencies
+    from src.aliases import file_lock, LOCK_SUFFIX
+except ImportError:
+    from cache import normalize_question
+    from metrics import REGISTRY
+    from latency import summarize_latencies
+    from aliases import file_lock, LOCK_SUFFIX
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DROPPED = REGISTRY.counter('rag_query_log_dropped_total', 'Query log records dropped because the writer fell behind')
+
+DEFAULT_PATH = "./query_logs/queries.jsonl"
+BUCKET_FORMATS = {'minute': '%Y-%m-%dT%H:%M', 'hour': '%Y-%m-%dT%H:00', 'day': '%Y-%m-%d'}
+
+
+class QueryLog:
+    """Non-blocking JSONL query log with batched writes and size-based rotation."""
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = 50 * 1024 * 1024, backups: int = 5,
+                 batch_size: int = 200, flush_interval: float = 1.0, max_queue: int = 10000):
+        """Initialize log; the writer thread starts with the first record.
+
+        Args:
+            path: JSONL file; rotated copies get .1, .2, ... suffixes
+            max_bytes: Size at which the file is rotated
+            backups: Rotated files kept
+            batch_size: Most records written per batch
+            flush_interval: Seconds a record may wait before its batch is written
+            max_queue: Records buffered before new ones are dropped
+        """
+        self.path = Path(path)
+        # Serializes rotation and appends across worker processes
+        self.lock_path = self.path.with_name(self.path.name + LOCK_SUFFIX)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> Optional['QueryLog']:
+        """Create the log from environment variables, None unless RAG_QUERY_LOG is set."""
+        path = os.getenv("RAG_QUERY_LOG")
+        if not path:
+            return None
+        return cls(
+            path=path,
+            max_bytes=int(float(os.getenv("RAG_QUERY_LOG_MAX_MB", "50")) * 1024 * 1024),
+            backups=int(os.getenv("RAG_QUERY_LOG_BACKUPS", "5"))
+        )
+
+    def record(self, entry: Dict[str, Any]):
+        """Queue a record for writing; never blocks."""
+        if self._pid != os.getpid():
+            self._start_writer()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            DROPPED.inc()
+
+    def _start_writer(self):
+        """Start the writer thread in this process; threads do not survive a pre-fork server's fork."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, args=(self._queue,), name='query-log', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def close(self):
+        """Write everything queued so far and stop the writer."""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self, records: queue.Queue):
+        stopping = False
+        while not stopping:
+            try:
+                entry = records.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    entry = records.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """Append a batch, rotating first if it would grow the file past max_bytes."""
+        data = ''.join(json.dumps(entry, ensure_ascii=False, default=str) + '\n' for entry in batch)
+        try:
+            # Held from the size check to the append, so workers never rotate the same file twice
+            with file_lock(self.lock_path):
+                try:
+                    size = self.path.stat().st_size
+                except FileNotFoundError:
+                    size = 0
+                if size and size + len(data) > self.max_bytes:
+                    self._rotate()
+                # Opened per batch so each worker process follows rotations done by the others
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+        except OSError as e:
+            logger.error(f"Failed to write {len(batch)} query log records to {self.path}: {e}")
+
+    def _rotate(self):
+        """queries.jsonl -> .1 -> .2 ..., dropping the oldest beyond backups; callers hold the lock."""
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else self.path.with_name(f"{self.path.name}.{index - 1}")
+            if index == self.backups:
+                self.path.with_name(f"{self.path.name}.{index}").unlink(missing_ok=True)
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index}"))
+        if self.backups <= 0:
+            self.path.unlink(missing_ok=True)
+
+
+def query_record(question: str, result: Dict[str, Any], timings: Optional[Dict[str, float]],
+                 retrieved: Optional[List[Dict[str, Any]]], model: str, latency_ms: float,
+                 cache_enabled: bool) -> Dict[str, Any]:
+    """Query log record for one answered question."""
+    if result.get('cached'):
+        cache = 'hit'
+    else:
+        cache = 'miss' if cache_enabled else None
+    return {
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'question': question,
+        'key': normalize_question(question),
+        'chunks': [doc['id'] for doc in retrieved or []],
+        'distances': [round(doc['distance'], 4) for doc in retrieved or []],
+        'timings_ms': timings or {},
+        'latency_ms': latency_ms,
+        'model': model,
+        'answer_mode': result.get('answer_mode', 'llm'),
+        'cache': cache,
+        'error': result.get('error')
+    }
+
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Records of a log and its rotated files, oldest file first; unreadable lines are skipped."""
+    base = Path(path)
+    rotated = [p for p in base.parent.glob(f"{base.name}.*") if p.suffix[1:].isdigit()]
+    rotated.sort(key=lambda p: int(p.suffix[1:]), reverse=True)
+    records = []
+    for file in rotated + [base]:
+        if not file.exists():
+            continue
+        with open(file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+    return records
+
+
+def analyze(records: List[Dict[str, Any]], top: int = 20, bucket: str = 'hour') -> Dict[str, Any]:
+    """Top questions, latency percentiles (overall and per stage) and per-period traffic and cache hit ratio."""
+    keys = Counter(record.get('key') or normalize_question(record.get('question', '')) for record in records)
+    examples = {}
+    for record in records:
+        examples.setdefault(record.get('key') or normalize_question(record.get('question', '')), record.get('question'))
+
+    stages = {}
+    for record in records:
+        for stage, value in (record.get('timings_ms') or {}).items():
+            stages.setdefault(stage, []).append(value)
+
+    periods = {}
+    for record in records:
+        try:
+            stamp = time.strptime(record['ts'], '%Y-%m-%dT%H:%M:%SZ')
+        except (KeyError, ValueError):
+            continue
+        period = periods.setdefault(time.strftime(BUCKET_FORMATS[bucket], stamp),
+                                    {'queries': 0, 'hits': 0, 'lookups': 0, 'errors': 0, 'latencies': []})
+        period['queries'] += 1
+        period['errors'] += bool(record.get('error'))
+        if record.get('cache'):
+            period['lookups'] += 1
+            period['hits'] += record['cache'] == 'hit'
+        if record.get('latency_ms') is not None:
+            period['latencies'].append(record['latency_ms'])
+
+    lookups = sum(1 for record in records if record.get('cache'))
+    hits = sum(1 for record in records if record.get('cache') == 'hit')
+    return {
+        'queries': len(records),
+        'unique_questions': len(keys),
+        'top_questions': [{'question': examples[key], 'key': key, 'count': count}
+                          for key, count in keys.most_common(top)],
+        'latency_ms': summarize_latencies([r['latency_ms'] for r in records if r.get('latency_ms') is not None]),
+        'stage_latency_ms': {stage: summarize_latencies(values) for stage, values in sorted(stages.items())},
+        'cache_hit_ratio': hits / lookups if lookups else None,
+        'answer_modes': dict(Counter(record.get('answer_mode', 'llm') for record in records)),
+        'periods': {
+            name: {
+                'queries': period['queries'],
+                'errors': period['errors'],
+                'cache_hit_ratio': period['hits'] / period['lookups'] if period['lookups'] else None,
+                'latency_p50_ms': summarize_latencies(period['latencies'])['p50'],
+                'latency_p95_ms': summarize_latencies(period['latencies'])['p95']
+            }
+            for name, period in sorted(periods.items())
+        }
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Summarize the query log."""
+    parser = argparse.ArgumentParser(description='Top questions, latency percentiles and cache hit ratios from the query log')
+    parser.add_argument('--path', default=os.getenv('RAG_QUERY_LOG', DEFAULT_PATH),
+                        help='Query log file (rotated .1, .2, ... files are included)')
+    parser.add_argument('--top', type=int, default=20, help='Most frequent questions to show')
+    parser.add_argument('--bucket', choices=list(BUCKET_FORMATS), default='hour', help='Period for the over-time table')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    args = parser.parse_args(argv)
+    records = read_records(args.path)
+    if not records:
+        print(f"No query log records found at {args.path}")
+        return 1
+    summary = analyze(records, args.top, args.bucket)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print(f"{summary['queries']} queries, {summary['unique_questions']} unique questions")
+    ratio = summary['cache_hit_ratio']
+    print(f"Cache hit ratio: {ratio:.1%}" if ratio is not None else "Cache hit ratio: n/a (answer cache off)")
+    print(f"Answer modes: {', '.join(f'{mode}={count}' for mode, count in summary['answer_modes'].items())}")
+
+    print(f"\nTOP {args.top} QUESTIONS")
+    print("=" * 80)
+    for entry in summary['top_questions']:
+        print(f"{entry['count']:6d}  {entry['question']}")
+
+    print("\nLATENCY (ms)")
+    print("=" * 80)
+    print(f"{'stage':<16}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, stats in [('total', summary['latency_ms'])] + list(summary['stage_latency_ms'].items()):
+        print(f"{stage:<16}{stats['count']:>8}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}")
+
+    print(f"\nPER {args.bucket.upper()}")
+    print("=" * 80)
+    print(f"{'period':<18}{'queries':>8}{'errors':>8}{'hit ratio':>11}{'p50':>10}{'p95':>10}")
+    for name, period in summary['periods'].items():
+        hit_ratio = f"{period['cache_hit_ratio']:.1%}" if period['cache_hit_ratio'] is not None else 'n/a'
+        print(f"{name:<18}{period['queries']:>8}{period['errors']:>8}{hit_ratio:>11}"
+              f"{period['latency_p50_ms']:>10.1f}{period['latency_p95_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
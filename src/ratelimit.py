@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting for OpenRouter shared across processes on a host.
+Implements a token bucket as a generic cell rate algorithm (GCRA) whose state is a
+single timestamp in SQLite: every caller reserves the next free slot in one
+transaction, so workers, retries and evaluation runs draw from one budget and
+are served in arrival order. Each API base URL has a bucket of its own, so a local
+stand-in (src/fake_openrouter.py) never draws from the OpenRouter budget.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Optional
+
+try:
+    from src.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+RATE_LIMIT_WAIT = REGISTRY.histogram('rag_rate_limit_wait_seconds', 'Time spent waiting for an OpenRouter token')
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no token becomes available within the allowed wait."""
+
+
+def bucket_name(base_url: Optional[str] = None) -> str:
+    """Bucket name for an API base URL (default: OPENROUTER_BASE_URL)."""
+    base_url = base_url or os.getenv("OPENROUTER_BASE_URL", DEFAULT_BASE_URL)
+    return f"openrouter:{base_url.rstrip('/')}"
+
+
+class TokenBucket:
+    """Token bucket shared between processes through a SQLite file."""
+
+    def __init__(
+        self,
+        name: str = "openrouter",
+        rate_per_minute: float = 20.0,
+        burst: int = 5,
+        db_path: str = "./.rate_limit.sqlite3"
+    ):
+        """Initialize bucket.
+
+        Args:
+            name: Bucket name, processes using the same name and file share a budget
+            rate_per_minute: Sustained requests per minute
+            burst: Requests allowed back-to-back when the bucket is full
+            db_path: SQLite file holding the shared state
+        """
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1, burst)
+        self.db_path = db_path
+        self.interval = 60.0 / rate_per_minute
+        # How far ahead of real time the schedule may run before callers must wait
+        self.tolerance = (self.burst - 1) * self.interval
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_env(cls, base_url: Optional[str] = None) -> Optional['TokenBucket']:
+        """Create the bucket for an API base URL from environment variables, None unless
+        OPENROUTER_RATE_LIMIT_RPM is set."""
+        rate = float(os.getenv("OPENROUTER_RATE_LIMIT_RPM", "0"))
+        if rate <= 0:
+            return None
+        return cls(
+            name=bucket_name(base_url),
+            rate_per_minute=rate,
+            burst=int(os.getenv("OPENROUTER_RATE_LIMIT_BURST", "5")),
+            db_path=os.getenv("OPENROUTER_RATE_LIMIT_DB", "./.rate_limit.sqlite3")
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Reserve one token, sleeping until it is due. Returns seconds waited.
+
+        Raises RateLimitTimeout without consuming a token if the wait would exceed timeout.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tat FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            now = time.time()
+            tat = max(row[0] if row else now, now)
+            wait = max(0.0, tat - self.tolerance - now)
+
+            if timeout is not None and wait > timeout:
+                conn.execute("ROLLBACK")
+                raise RateLimitTimeout(f"Rate limit wait {wait:.1f}s exceeds {timeout:.1f}s")
+
+            conn.execute(
+                "INSERT INTO buckets (name, tat) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tat = excluded.tat",
+                (self.name, tat + self.interval)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if wait > 0:
+            logger.info(f"Waiting {wait:.2f}s for {self.name} rate limit token")
+            time.sleep(wait)
+        RATE_LIMIT_WAIT.observe(wait)
+        return wait
+
+    def penalize(self, seconds: float):
+        """Push the shared schedule back after the server reported a rate limit (429)."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tat FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            # Nothing is allowed until `seconds` from now, and then only one request at a time
+            blocked_until = time.time() + seconds + self.tolerance
+            tat = max(row[0] if row else 0.0, blocked_until)
+            conn.execute(
+                "INSERT INTO buckets (name, tat) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tat = excluded.tat",
+                (self.name, tat)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        logger.warning(f"Rate limited by server, pausing {self.name} requests for {seconds:.1f}s")
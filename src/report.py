@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Print an analysis of saved evaluation results.
+Reads evaluation_results/detailed_results.csv and summary.json with the standard
+library only, so it starts instantly (no pandas, torch or plotting imports).
+"""
+
+import csv
+import json
+import argparse
+import statistics
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+
+def load_rows(path: Path) -> List[Dict[str, Any]]:
+    """Load per-query results, converting numeric columns."""
+    numeric = ('groundedness_score', 'citation_accuracy_score', 'latency_ms')
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for column in numeric:
+            row[column] = float(row[column])
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], failed: List[Dict[str, Any]]):
+    """Print overall and per-category metrics."""
+    print("=" * 60)
+    print("EVALUATION RESULTS ANALYSIS")
+    print("=" * 60)
+    print(f"\nTotal queries: {len(rows) + len(failed)}")
+    print(f"Successful queries: {len(rows)}")
+    print(f"Failed queries: {len(failed)}")
+
+    if rows:
+        print(f"\n--- SUCCESSFUL QUERIES METRICS ---")
+        print(f"Average Groundedness: {statistics.mean(r['groundedness_score'] for r in rows):.2%}")
+        print(f"Average Citation Accuracy: {statistics.mean(r['citation_accuracy_score'] for r in rows):.2%}")
+        print(f"Average Latency: {statistics.mean(r['latency_ms'] for r in rows):.0f}ms")
+        print(f"Median Latency: {statistics.median(r['latency_ms'] for r in rows):.0f}ms")
+
+        print(f"\n--- BY CATEGORY ---")
+        for category in dict.fromkeys(r['category'] for r in rows):
+            cat_rows = [r for r in rows if r['category'] == category]
+            print(f"\n{category}:")
+            print(f"  Queries: {len(cat_rows)}")
+            print(f"  Groundedness: {statistics.mean(r['groundedness_score'] for r in cat_rows):.2%}")
+            print(f"  Citation Accuracy: {statistics.mean(r['citation_accuracy_score'] for r in cat_rows):.2%}")
+            print(f"  Latency: {statistics.mean(r['latency_ms'] for r in cat_rows):.0f}ms")
+
+    if failed:
+        print(f"\n--- FAILED QUERIES ---")
+        for entry in failed:
+            print(f"  [{entry['error']}] {entry['query']}")
+
+    print("\n" + "=" * 60)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Analyze saved evaluation results."""
+    parser = argparse.ArgumentParser(description='Analyze saved evaluation results')
+    parser.add_argument('--results-dir', type=Path, default=Path('evaluation_results'),
+                        help='Directory written by the evaluation')
+
+    args = parser.parse_args(argv)
+
+    csv_path = args.results_dir / 'detailed_results.csv'
+    if not csv_path.exists():
+        print(f"No results found at {csv_path}. Run the evaluation first.")
+        return 1
+
+    failed = []
+    summary_path = args.results_dir / 'summary.json'
+    if summary_path.exists():
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            failed = json.load(f).get('failed_queries', [])
+
+    print_report(load_rows(csv_path), failed)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Lightweight query router for metadata-filtered retrieval.
+Predicts which policy sources a question is about so the vector search can be
+narrowed with a Chroma `where` filter instead of scanning the whole collection.
+"""
+
+import re
+import logging
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words that appear in most document titles and say nothing about the topic
+GENERIC_TITLE_WORDS = {'policy', 'policies', 'procedure', 'procedures', 'and', 'the', 'of', 'guide'}
+
+
+class QueryRouter:
+    """Routes questions to the most likely sources using keywords and embedding centroids."""
+
+    def __init__(
+        self,
+        source_ids: List[str],
+        centroids: np.ndarray,
+        keywords: Optional[Dict[str, List[str]]] = None,
+        min_margin: float = 0.05,
+        max_sources: int = 2
+    ):
+        """Initialize router.
+
+        Args:
+            source_ids: Source identifiers, one per centroid row
+            centroids: Unit-normalized mean chunk embedding per source
+            keywords: Optional phrases per source that route a question directly
+            min_margin: Cosine gap required between the last routed source and the next one
+            max_sources: Maximum number of sources a filtered search may cover
+        """
+        self.source_ids = source_ids
+        self.centroids = centroids
+        self.keywords = keywords or {}
+        self.min_margin = min_margin
+        self.max_sources = max_sources
+
+    @classmethod
+    def from_collection(cls, collection, **kwargs) -> 'QueryRouter':
+        """Build a router from the embeddings and metadata stored in a collection."""
+        data = collection.get(include=['embeddings', 'metadatas'])
+        embeddings = np.asarray(data['embeddings'], dtype=np.float32)
+
+        grouped: Dict[str, List[int]] = {}
+        titles: Dict[str, str] = {}
+        for i, metadata in enumerate(data['metadatas']):
+            source_id = metadata['source_id']
+            grouped.setdefault(source_id, []).append(i)
+            titles[source_id] = metadata.get('title', '')
+
+        source_ids = sorted(grouped)
+        centroids = np.zeros((len(source_ids), embeddings.shape[1]), dtype=np.float32)
+        for row, source_id in enumerate(source_ids):
+            centroid = embeddings[grouped[source_id]].mean(axis=0)
+            centroids[row] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        keywords = kwargs.pop('keywords', None) or {
+            source_id: cls._title_keywords(titles[source_id]) for source_id in source_ids
+        }
+
+        logger.info(f"Query router built for {len(source_ids)} sources")
+        return cls(source_ids, centroids, keywords=keywords, **kwargs)
+
+    @staticmethod
+    def _title_keywords(title: str) -> List[str]:
+        """Derive a routing phrase from a document title, e.g. 'Remote Work Policy' -> 'remote work'."""
+        words = [w for w in title.lower().split() if w not in GENERIC_TITLE_WORDS]
+        return [' '.join(words)] if words else []
+
+    def route(self, question: str, query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return a Chroma `where` filter for the question, or None to search everything."""
+        if len(self.source_ids) < 2:
+            return None
+
+        sources = self._route_by_keywords(question) or self._route_by_centroids(query_embedding)
+        if not sources:
+            return None
+
+        logger.info(f"Routing query to {len(sources)} source(s): {sources}")
+        if len(sources) == 1:
+            return {'source_id': sources[0]}
+        return {'source_id': {'$in': sources}}
+
+    def _route_by_keywords(self, question: str) -> List[str]:
+        """Route when the question names exactly one source's topic."""
+        question_lower = question.lower()
+        matches = [
+            source_id for source_id, phrases in self.keywords.items()
+            if any(re.search(r'\b' + re.escape(phrase), question_lower) for phrase in phrases)
+        ]
+        return matches if len(matches) == 1 else []
+
+    def _route_by_centroids(self, query_embedding: List[float]) -> List[str]:
+        """Route to the closest sources when they stand clearly apart from the rest."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        similarities = self.centroids @ query
+        order = np.argsort(-similarities)
+
+        # Take the smallest top-n set separated from the next source by a confident margin
+        for n in range(1, min(self.max_sources, len(order) - 1) + 1):
+            if similarities[order[n - 1]] - similarities[order[n]] >= self.min_margin:
+                return [self.source_ids[i] for i in order[:n]]
+
+        return []
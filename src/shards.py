@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Source-partitioned index shards.
+Ingestion assigns every document to one of N shards by department (its first
+sub-directory under the corpus, or the file itself for a flat corpus), and each shard
+is an independently versioned alias (`company_policies_shard0`, ...), either as a
+collection in the shared persist directory or in its own directory. ShardedCollection
+fans queries out to the shards in parallel and merges the top-k by distance.
+"""
+
+import os
+import zlib
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set
+
+import numpy as np
+
+try:
+    from src.profiling import profiling_active
+except ImportError:
+    from profiling import profiling_active
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SHARD_LAYOUTS = ('collections', 'directories')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def shard_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by every sharded view of this process.
+
+    Views are replaced on every alias swap, so they must not own threads. Created on
+    first use in each process, since threads do not survive a pre-fork server's fork.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(thread_name_prefix='shard')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def shard_for(file_path: Path, corpus: Path, num_shards: int) -> int:
+    """Shard of a corpus file; every file of a department sub-directory lands in the same shard."""
+    relative = Path(file_path).relative_to(corpus)
+    key = relative.parts[0] if len(relative.parts) > 1 else relative.as_posix()
+    return zlib.crc32(key.lower().encode('utf-8')) % num_shards
+
+
+def shard_alias(alias: str, shard: int) -> str:
+    """Alias of one shard."""
+    return f"{alias}_shard{shard}"
+
+
+def shard_persist_dir(persist_dir: str, shard: int, layout: str = 'collections') -> str:
+    """Chroma directory holding a shard: the shared one, or shard<N>/ inside it."""
+    if layout == 'directories':
+        return os.path.join(persist_dir, f"shard{shard}")
+    return persist_dir
+
+
+class ShardedCollection:
+    """Read-only view over shard collections with the subset of the Chroma collection API used here.
+
+    Queries with a `source_id` filter only go to the shards holding those sources;
+    everything else fans out to every shard on the shared thread pool.
+    """
+
+    def __init__(self, shards: List[Any]):
+        """Initialize sharded view.
+
+        Args:
+            shards: Chroma collections (or compatible objects), one per shard
+        """
+        self.shards = shards
+        self.name = '+'.join(shard.name for shard in shards)
+        self.metadata = {'shards': len(shards)}
+        self._shard_sources: Optional[List[Set[str]]] = None
+
+    def _map(self, func, shards=None) -> List[Any]:
+        """Run func on each shard in parallel, preserving shard order."""
+        shards = self.shards if shards is None else shards
+        if profiling_active():
+            # Sequentially on the profiled thread, where cProfile can see it
+            return [func(shard) for shard in shards]
+        return list(shard_executor().map(func, shards))
+
+    def count(self) -> int:
+        """Chunks across all shards."""
+        return sum(self._map(lambda shard: shard.count()))
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Fetch chunks from every shard and concatenate them in shard order."""
+        kwargs = {'ids': ids, 'where': where, 'limit': limit}
+        if include is not None:
+            kwargs['include'] = include
+        results = self._map(lambda shard: shard.get(**kwargs), self._shards_for(where))
+
+        merged = {'ids': [chunk_id for result in results for chunk_id in result['ids']]}
+        for key in ('documents', 'metadatas'):
+            if results and results[0].get(key) is not None:
+                merged[key] = [item for result in results for item in result[key]]
+        if include and 'embeddings' in include:
+            blocks = [np.asarray(result['embeddings']) for result in results if len(result['ids'])]
+            merged['embeddings'] = np.vstack(blocks) if blocks else np.empty((0, 0), dtype=np.float32)
+
+        if limit is not None:
+            merged = {key: value[:limit] for key, value in merged.items()}
+        return merged
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Top-k per shard in parallel, merged into the global top-k by distance."""
+        include = list(include or ('documents', 'metadatas', 'distances'))
+        shard_include = include if 'distances' in include else include + ['distances']
+        shards = self._shards_for(where)
+
+        def search(shard):
+            return shard.query(query_embeddings=query_embeddings, n_results=n_results,
+                               where=where, include=shard_include)
+
+        results = self._map(search, shards)
+
+        merged = {'ids': []}
+        for key in include:
+            merged[key] = []
+        for q in range(len(query_embeddings)):
+            candidates = []
+            for result in results:
+                for i in range(len(result['ids'][q])):
+                    candidates.append((result['distances'][q][i], result, i))
+            candidates.sort(key=lambda candidate: candidate[0])
+            top = candidates[:n_results]
+
+            merged['ids'].append([result['ids'][q][i] for _, result, i in top])
+            for key in include:
+                merged[key].append([result[key][q][i] for _, result, i in top])
+        return merged
+
+    def _shards_for(self, where: Optional[Dict[str, Any]]) -> List[Any]:
+        """Shards that can match a filter: those holding the filtered sources, or all of them."""
+        condition = (where or {}).get('source_id')
+        if condition is None:
+            return self.shards
+        if isinstance(condition, dict):
+            sources = condition.get('$in') or ([condition['$eq']] if '$eq' in condition else None)
+        else:
+            sources = [condition]
+        if not sources:
+            return self.shards
+
+        # Partitioning is by source, so learn which shard holds which sources once
+        if self._shard_sources is None:
+            self._shard_sources = self._map(
+                lambda shard: {m['source_id'] for m in shard.get(include=['metadatas'])['metadatas']}
+            )
+        wanted = set(sources)
+        selected = [shard for shard, held in zip(self.shards, self._shard_sources) if held & wanted]
+        return selected or self.shards[:1]
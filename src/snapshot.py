@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Single-file index snapshots.
+Packs chunk texts, metadata and the embedding matrix of a Chroma collection into one
+versioned file that serving replicas memory-map read-only. The OS page cache shares
+the mapped embeddings between every process on the host, and opening a snapshot
+costs a header read instead of a SQLite/HNSW load.
+
+File layout (little-endian):
+    magic (8 bytes) | format version (uint32) | reserved (uint32) | header length (uint64)
+    header (UTF-8 JSON: counts, dimension, distance space, block offsets, source info)
+    embeddings (count x dim float32, 64-byte aligned) | squared row norms (count float32)
+    records (UTF-8 JSON: ids, documents, metadatas)
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    from src.aliases import AliasRegistry, DEFAULT_ALIAS
+except ImportError:
+    from aliases import AliasRegistry, DEFAULT_ALIAS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RAGSNAP\x00"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sIIQ")
+ALIGNMENT = 64
+SPACES = ('l2', 'cosine', 'ip')
+DEFAULT_INCLUDE = ('documents', 'metadatas')
+
+
+class SnapshotError(Exception):
+    """Raised when a file is not a readable snapshot."""
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def export_snapshot(collection, path: str, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Write a collection to a snapshot file, atomically replacing any existing one."""
+    data = collection.get(include=['embeddings', 'documents', 'metadatas'])
+    embeddings = np.ascontiguousarray(np.asarray(data['embeddings'], dtype=np.float32))
+    if embeddings.ndim != 2:
+        raise SnapshotError(f"Collection '{collection.name}' has no embeddings to export")
+
+    metadata = collection.metadata or {}
+    configuration = getattr(collection, 'configuration', None) or {}
+    space = (configuration.get('hnsw') or {}).get('space') or metadata.get('hnsw:space', 'l2')
+    records = json.dumps({
+        'ids': data['ids'],
+        'documents': data['documents'],
+        'metadatas': data['metadatas']
+    }).encode('utf-8')
+
+    count, dim = embeddings.shape
+    header = {
+        'count': count,
+        'dim': dim,
+        'dtype': 'float32',
+        'space': space,
+        'collection': collection.name,
+        'collection_metadata': metadata,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        **(info or {})
+    }
+
+    # Offsets depend on the header length, which depends on the offsets: reserve room first
+    header.update(matrix_offset=0, norms_offset=0, records_offset=0, records_length=len(records))
+    header_bytes = json.dumps(header).encode('utf-8') + b' ' * 64
+    matrix_offset = _aligned(PREAMBLE.size + len(header_bytes))
+    norms_offset = matrix_offset + embeddings.nbytes
+    records_offset = _aligned(norms_offset + count * 4)
+    header.update(matrix_offset=matrix_offset, norms_offset=norms_offset, records_offset=records_offset)
+    header_bytes = json.dumps(header).encode('utf-8').ljust(matrix_offset - PREAMBLE.size)
+
+    norms = np.einsum('ij,ij->i', embeddings, embeddings).astype(np.float32)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(embeddings.tobytes())
+            f.write(norms.tobytes())
+            f.write(b'\x00' * (records_offset - norms_offset - norms.nbytes))
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Exported {count} chunks from '{collection.name}' to {path}")
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Read a snapshot's header without mapping the data blocks."""
+    with open(path, 'rb') as f:
+        return _parse_header(f.read(PREAMBLE.size), f)
+
+
+def _parse_header(preamble: bytes, f) -> Dict[str, Any]:
+    if len(preamble) < PREAMBLE.size:
+        raise SnapshotError("File too short to be a snapshot")
+    magic, version, _, header_length = PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise SnapshotError("Not a snapshot file (bad magic)")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION})")
+    return json.loads(f.read(header_length))
+
+
+class SnapshotIndex:
+    """Read-only, memory-mapped snapshot with the subset of the Chroma collection API used here.
+
+    Supports count(), get() and query() with `where` filters built from equality,
+    $eq, $ne, $in, $nin, $and and $or. Search is exact (brute force over the mapped
+    matrix), which is faster than HNSW at policy-corpus sizes.
+    """
+
+    def __init__(self, path: str):
+        """Map a snapshot file.
+
+        Args:
+            path: Snapshot written by export_snapshot
+        """
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self.header = _parse_header(f.read(PREAMBLE.size), f)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        count, dim = self.header['count'], self.header['dim']
+        self.name = self.header['collection']
+        self.metadata = self.header.get('collection_metadata', {})
+        self.space = self.header['space']
+        if self.space not in SPACES:
+            raise SnapshotError(f"Unsupported distance space: {self.space}")
+
+        # Views into the shared mapping, nothing is copied
+        self.embeddings = np.frombuffer(self._mmap, dtype=np.float32, count=count * dim,
+                                        offset=self.header['matrix_offset']).reshape(count, dim)
+        self._norms = np.frombuffer(self._mmap, dtype=np.float32, count=count,
+                                    offset=self.header['norms_offset'])
+
+        start = self.header['records_offset']
+        records = json.loads(self._mmap[start:start + self.header['records_length']])
+        self._ids = records['ids']
+        self._documents = records['documents']
+        self._metadatas = records['metadatas']
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+
+        logger.info(f"Mapped snapshot {self.path}: {count} chunks, dim {dim}, space {self.space}")
+
+    def count(self) -> int:
+        """Number of chunks in the snapshot."""
+        return len(self._ids)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Fetch chunks by id and/or metadata filter."""
+        if ids is None:
+            rows = list(range(len(self._ids)))
+        else:
+            rows = [self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions]
+        if where:
+            rows = [i for i in rows if _matches(self._metadatas[i], where)]
+        if limit is not None:
+            rows = rows[:limit]
+        return self._rows(rows, include or DEFAULT_INCLUDE)
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Exact nearest-neighbour search, returning Chroma-shaped nested lists."""
+        include = include or ('documents', 'metadatas', 'distances')
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.embeddings.shape[1])
+
+        candidates = None
+        if where:
+            candidates = np.array([i for i, m in enumerate(self._metadatas) if _matches(m, where)], dtype=np.int64)
+
+        results = {'ids': []}
+        for key in include:
+            results[key] = []
+
+        for query in queries:
+            distances = self._distances(query, candidates)
+            k = min(n_results, len(distances))
+            top = np.argpartition(distances, k - 1)[:k] if 0 < k < len(distances) else np.arange(k)
+            top = top[np.argsort(distances[top], kind='stable')]
+            rows = (candidates[top] if candidates is not None else top).tolist()
+
+            batch = self._rows(rows, [key for key in include if key != 'distances'])
+            results['ids'].append(batch['ids'])
+            for key in include:
+                results[key].append(distances[top].tolist() if key == 'distances' else batch[key])
+
+        return results
+
+    def _distances(self, query: np.ndarray, candidates: Optional[np.ndarray]) -> np.ndarray:
+        """Distances in the collection's space, matching Chroma's definitions."""
+        matrix = self.embeddings if candidates is None else self.embeddings[candidates]
+        dots = matrix @ query
+        if self.space == 'ip':
+            return 1.0 - dots
+        if self.space == 'cosine':
+            norms = np.sqrt(self._norms if candidates is None else self._norms[candidates])
+            return 1.0 - dots / np.maximum(norms * np.linalg.norm(query), 1e-12)
+        norms = self._norms if candidates is None else self._norms[candidates]
+        return np.maximum(norms + query @ query - 2.0 * dots, 0.0)
+
+    def _rows(self, rows: List[int], include) -> Dict[str, Any]:
+        result = {'ids': [self._ids[i] for i in rows]}
+        if 'documents' in include:
+            result['documents'] = [self._documents[i] for i in rows]
+        if 'metadatas' in include:
+            result['metadatas'] = [self._metadatas[i] for i in rows]
+        if 'embeddings' in include:
+            result['embeddings'] = self.embeddings[rows]
+        return result
+
+
+def _matches(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a Chroma-style metadata filter."""
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == '$eq' and value != operand:
+                    return False
+                if op == '$ne' and value == operand:
+                    return False
+                if op == '$in' and value not in operand:
+                    return False
+                if op == '$nin' and value in operand:
+                    return False
+                if op not in ('$eq', '$ne', '$in', '$nin'):
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None):
+    """Export or inspect index snapshots."""
+    parser = argparse.ArgumentParser(description='Export or inspect single-file index snapshots')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Write a Chroma collection to a snapshot file')
+    export_parser.add_argument('--persist-dir', default=os.getenv('CHROMA_PERSIST_DIRECTORY', './chroma_db'),
+                               help='Chroma persistence directory')
+    export_parser.add_argument('--collection', default=DEFAULT_ALIAS,
+                               help='Collection or alias to export (aliases resolve to their live version)')
+    export_parser.add_argument('--output', default='./index.snapshot', help='Snapshot file to write')
+
+    info_parser = subparsers.add_parser('info', help='Print a snapshot header')
+    info_parser.add_argument('path', help='Snapshot file')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        try:
+            header = read_header(args.path)
+        except (OSError, SnapshotError) as e:
+            print(f"Cannot read snapshot: {e}")
+            return 1
+        print(json.dumps(header, indent=2))
+        return 0
+
+    # Only exporting needs chromadb
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=args.persist_dir, settings=Settings(anonymized_telemetry=False))
+    name = AliasRegistry(args.persist_dir).resolve(args.collection)
+    try:
+        collection = client.get_collection(name)
+    except Exception as e:
+        logger.error(f"Failed to open collection '{name}': {e}")
+        return 1
+
+    if (collection.metadata or {}).get('parents_collection'):
+        logger.warning(f"{collection.name} is a small-to-big version; the snapshot holds its child passages "
+                       f"only, so snapshot serving returns passages instead of parent sections")
+    header = export_snapshot(collection, args.output)
+    size_mb = Path(args.output).stat().st_size / (1024 * 1024)
+    print(f"Wrote {args.output}: {header['count']} chunks, dim {header['dim']}, "
+          f"space {header['space']}, {size_mb:.2f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
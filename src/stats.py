@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Print statistics about the Chroma index.
+Reads Chroma's SQLite catalog directly in read-only mode, which avoids importing
+chromadb (over a second of startup); falls back to the chromadb client when the
+catalog layout is not recognized.
+"""
+
+import os
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+COLLECTION_COUNTS_SQL = """
+    SELECT c.name, COUNT(e.id)
+    FROM collections c
+    LEFT JOIN segments s ON s.collection = c.id AND s.scope = 'METADATA'
+    LEFT JOIN embeddings e ON e.segment_id = s.id
+    GROUP BY c.name
+    ORDER BY c.name
+"""
+
+SOURCE_COUNTS_SQL = """
+    SELECT m.string_value, COUNT(*)
+    FROM collections c
+    JOIN segments s ON s.collection = c.id AND s.scope = 'METADATA'
+    JOIN embeddings e ON e.segment_id = s.id
+    JOIN embedding_metadata m ON m.id = e.id AND m.key = 'source_id'
+    WHERE c.name = ?
+    GROUP BY m.string_value
+    ORDER BY m.string_value
+"""
+
+
+def read_catalog(persist_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Chunk counts per collection and per source, straight from chroma.sqlite3."""
+    conn = sqlite3.connect(f"file:{persist_dir / 'chroma.sqlite3'}?mode=ro", uri=True)
+    try:
+        collections = {}
+        for name, count in conn.execute(COLLECTION_COUNTS_SQL):
+            sources = dict(conn.execute(SOURCE_COUNTS_SQL, (name,)).fetchall())
+            collections[name] = {'chunks': count, 'sources': sources}
+        return collections
+    finally:
+        conn.close()
+
+
+def read_with_client(persist_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Same statistics through the chromadb client."""
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=str(persist_dir), settings=Settings(anonymized_telemetry=False))
+    collections = {}
+    for collection in client.list_collections():
+        collection = client.get_collection(collection.name)
+        sources = {}
+        for metadata in collection.get(include=['metadatas'])['metadatas']:
+            sources[metadata['source_id']] = sources.get(metadata['source_id'], 0) + 1
+        collections[collection.name] = {'chunks': collection.count(), 'sources': dict(sorted(sources.items()))}
+    return collections
+
+
+def directory_size_mb(path: Path) -> float:
+    """Total size of files under path in MB."""
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file()) / (1024 * 1024)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Print index statistics."""
+    parser = argparse.ArgumentParser(description='Show Chroma index statistics')
+    parser.add_argument('--persist-dir', type=Path,
+                        default=Path(os.getenv('CHROMA_PERSIST_DIRECTORY', './chroma_db')),
+                        help='Chroma persistence directory')
+
+    args = parser.parse_args(argv)
+
+    if not (args.persist_dir / 'chroma.sqlite3').exists():
+        print(f"No Chroma index found in {args.persist_dir}. Run ingestion first.")
+        return 1
+
+    try:
+        collections = read_catalog(args.persist_dir)
+    except sqlite3.Error:
+        collections = read_with_client(args.persist_dir)
+
+    print(f"Index: {args.persist_dir} ({directory_size_mb(args.persist_dir):.1f} MB)")
+    for name, info in collections.items():
+        print(f"\nCollection: {name}")
+        print(f"  Chunks: {info['chunks']}")
+        print(f"  Sources: {len(info['sources'])}")
+        for source, count in info['sources'].items():
+            print(f"    {source}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
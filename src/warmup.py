@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Cache warming.
+Replays the most frequent questions from the query log (src/querylog.py), or the evaluation set,
+through RAGSystem.query so their embeddings and answers are cached before users ask.
+RAGSystem runs it in the background after connecting and after every collection swap.
+Answers cost LLM tokens, so each one is generated once for all worker processes: warm-ups
+take turns under a file lock next to the alias registry, and the answers are shared through
+a JSON file beside the lock. A process loads the answers already in the file for the collection
+it serves, generates the missing ones paced by a token bucket of its own, and adds them to the file.
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+try:
+    from src.cache import normalize_question
+    from src.metrics import REGISTRY
+    from src.ratelimit import TokenBucket
+    from src.querylog import read_records
+    from src.aliases import file_lock
+except ImportError:
+    from cache import normalize_question
+    from metrics import REGISTRY
+    from ratelimit import TokenBucket
+    from querylog import read_records
+    from aliases import file_lock
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WARMED = REGISTRY.counter('rag_cache_warmed_total', 'Questions replayed into the caches by warm-up', ('result',))
+
+# RAG_WARM_SOURCE value that selects the evaluation set instead of a query log
+EVAL_SOURCE = 'eval'
+# Held by the process warming answers, in the Chroma persist directory next to aliases.json
+LOCK_FILE = "warmup.lock"
+# Answers warmed by any process, next to the lock
+ANSWERS_FILE = "warmup_answers.json"
+
+
+def log_questions(path: str, top_n: int) -> List[str]:
+    """Most frequent questions of a query log and its rotated files, by normalized key."""
+    if not Path(path).exists():
+        raise FileNotFoundError(path)
+    counts = Counter()
+    first_seen = {}
+    for record in read_records(path):
+        question = record.get('question')
+        if question:
+            key = normalize_question(question)
+            counts[key] += 1
+            first_seen.setdefault(key, question)
+    return [first_seen[key] for key, _ in counts.most_common(top_n)]
+
+
+def evaluation_questions(top_n: int, path: Optional[str] = None) -> List[str]:
+    """Questions of the evaluation set, in file order."""
+    # Imported here: evaluate imports rag, which imports this module
+    try:
+        from src.evaluate import RAGEvaluator, DEFAULT_QUERIES_PATH
+    except ImportError:
+        from evaluate import RAGEvaluator, DEFAULT_QUERIES_PATH
+    queries = RAGEvaluator(None, Path(path) if path else DEFAULT_QUERIES_PATH).evaluation_queries
+    return [entry['query'] for entry in queries[:top_n]]
+
+
+def load_questions(source: str, top_n: int) -> List[str]:
+    """Warm-up questions from a query log path, or from the evaluation set for 'eval'."""
+    if source == EVAL_SOURCE:
+        return evaluation_questions(top_n)
+    return log_questions(source, top_n)
+
+
+class CacheWarmer:
+    """Replays frequent questions into a RAGSystem's caches on a background thread."""
+
+    def __init__(self, rag_system, source: str, top_n: int = 50, rate_per_minute: float = 6.0,
+                 lock_path: Optional[Path] = None):
+        """Initialize warmer.
+
+        Args:
+            rag_system: System whose answer and embedding caches are filled
+            source: JSONL query log path, or 'eval' for the evaluation set
+            top_n: Questions replayed per run
+            rate_per_minute: Most LLM calls per minute for warming, across processes (0: unpaced)
+            lock_path: File lock serializing warm-ups across processes; the warmed answers are shared
+                in ANSWERS_FILE beside it. None warms answers locally only
+        """
+        self.rag_system = rag_system
+        self.source = source
+        self.top_n = top_n
+        self.lock_path = lock_path
+        self.answers_path = lock_path.with_name(ANSWERS_FILE) if lock_path else None
+        self.bucket = None
+        if rate_per_minute > 0:
+            self.bucket = TokenBucket(name='warmup', rate_per_minute=rate_per_minute, burst=1,
+                                      db_path=os.getenv("OPENROUTER_RATE_LIMIT_DB", "./.rate_limit.sqlite3"))
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._restart = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Warm in the background; a request during a run restarts it once that run ends."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._restart = True
+                return
+            self._thread = threading.Thread(target=self._loop, name='cache-warmer', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self.run()
+            with self._lock:
+                if not self._restart:
+                    return
+                self._restart = False
+
+    def run(self) -> Dict[str, Any]:
+        """Replay the questions once. Returns counts of warmed, loaded, already cached and failed questions."""
+        rag = self.rag_system
+        report = {'source': self.source, 'mode': None, 'warmed': 0, 'loaded': 0, 'cached': 0, 'failed': 0}
+        try:
+            questions = load_questions(self.source, self.top_n)
+        except Exception as e:
+            logger.error(f"Failed to load warm-up questions from {self.source}: {e}")
+            report['error'] = type(e).__name__
+            self.last_report = report
+            return report
+
+        if rag.answer_cache is None:
+            report['mode'] = 'embeddings'
+            for question in questions:
+                self._count(report, self._warm_embedding, question)
+        else:
+            report['mode'] = 'answers'
+            # Waits for a warm-up running in another process, then reuses its answers
+            with file_lock(self.lock_path) if self.lock_path else nullcontext(True):
+                collection = rag.collection
+                shared = self._load_answers(collection)
+                warmed = len(shared)
+                for question in questions:
+                    self._count(report, self._warm_answer, question, collection, shared)
+                if self.answers_path and len(shared) > warmed:
+                    self._write_answers(collection, shared)
+
+        logger.info(f"Cache warm-up ({report['mode']}) from {self.source}: {report['warmed']} warmed, "
+                    f"{report['loaded']} loaded, {report['cached']} already cached, {report['failed']} failed")
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def _count(report: Dict[str, Any], warm, question: str, *args):
+        try:
+            result = warm(question, *args)
+        except Exception as e:
+            logger.error(f"Failed to warm '{question}': {e}")
+            result = 'failed'
+        report[result] += 1
+        WARMED.inc(result=result)
+
+    def _warm_embedding(self, question: str) -> str:
+        rag = self.rag_system
+        if question in rag.embedding_cache:
+            return 'cached'
+        rag._encode_query(question)
+        return 'warmed'
+
+    def _warm_answer(self, question: str, collection, shared: Dict[str, Dict[str, Any]]) -> str:
+        rag = self.rag_system
+        key = normalize_question(question)
+        if key in rag.answer_cache:
+            return 'cached'
+        if key in shared:
+            rag._cache_answer(key, shared[key]['result'], collection, time.time() - shared[key]['at'])
+            return 'loaded'
+        if self.bucket:
+            self.bucket.acquire()
+        response = rag.query(question)
+        # Failed answers are not cached, so they count as failures
+        if response.get('error'):
+            return 'failed'
+        shared[key] = {'at': time.time(),
+                       'result': {k: v for k, v in response.items() if k not in ('timings_ms', 'cached')}}
+        return 'warmed'
+
+    def _load_answers(self, collection) -> Dict[str, Dict[str, Any]]:
+        """Unexpired answers of the shared file, if it was written for this collection."""
+        if not self.answers_path or not self.answers_path.exists():
+            return {}
+        try:
+            data = json.loads(self.answers_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable warm-up answers {self.answers_path}: {e}")
+            return {}
+        # Collection ids change on every re-index, even when the name is reused
+        if data.get('collection_id') != str(collection.id):
+            return {}
+        ttl = self.rag_system.answer_cache.ttl_seconds
+        now = time.time()
+        return {key: entry for key, entry in data.get('answers', {}).items()
+                if ttl is None or now - entry['at'] <= ttl}
+
+    def _write_answers(self, collection, answers: Dict[str, Dict[str, Any]]):
+        """Replace the shared answers file atomically; writers hold the lock."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.answers_path.parent, prefix=f".{ANSWERS_FILE}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'collection': collection.name, 'collection_id': str(collection.id), 'answers': answers}, f)
+            os.replace(tmp_path, self.answers_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
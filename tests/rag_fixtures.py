@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Shared helpers for tests that exercise RAGSystem on in-memory Chroma collections, without OpenRouter."""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import chromadb
+from chromadb.config import Settings
+
+from src.rag import RAGSystem
+
+_client = None
+
+
+def ephemeral_collection(name: str, ids, embeddings, metadatas, documents=None, metadata=None):
+    """In-memory Chroma collection with the given rows."""
+    global _client
+    if _client is None:
+        _client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+    collection = _client.create_collection(name=name, metadata=metadata)
+    collection.add(ids=list(ids), embeddings=[list(map(float, e)) for e in embeddings], metadatas=list(metadatas),
+                   documents=list(documents) if documents is not None else [f"Text of {i}" for i in ids])
+    return collection
+
+
+def rag_system(collection=None, parents=None, **settings) -> RAGSystem:
+    """RAGSystem serving a collection: no Chroma connection, API key, query router or embedding batcher.
+
+    settings are RAGSystem constructor arguments.
+    """
+    rag = RAGSystem(defer_connect=True, require_llm=False, embed_batch_window_ms=None,
+                    route_queries=False, **settings)
+    if collection is not None:
+        rag.use_collection(collection, parents)
+    return rag
+
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test adaptive retrieval depth and its retrieval scoring (runs offline, no API key needed)."""
+
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from rag_fixtures import ephemeral_collection, rag_system
+from src.evaluate import RAGEvaluator
+
+print("Testing Adaptive Retrieval Depth")
+print("=" * 50)
+
+rng = np.random.default_rng(3)
+dim = 16
+query = np.zeros(dim)
+query[0] = 1.0
+
+try:
+    # 8 chunks of the relevant source close to the query, 8 of other sources far from it
+    near = query + 0.2 * rng.normal(size=(8, dim))
+    far = -query + 0.2 * rng.normal(size=(8, dim))
+    sources = ['policies/pto-policy.md'] * 8 + ['policies/expense-policy.md'] * 4 + ['policies/security-policy.md'] * 4
+    collection = ephemeral_collection(
+        'depth_scoring', [f"chunk_{i}" for i in range(16)], np.vstack([near, far]),
+        [{'source_id': source, 'title': source, 'chunk_id': i} for i, source in enumerate(sources)]
+    )
+
+    # Test 1: search depth is top_k unless a threshold turns adaptive depth on
+    print("\n1. Testing fetch depth...")
+    rag = rag_system(collection)
+    assert not rag.adaptive_depth and rag.fetch_k == 5
+    rag.depth_relative_gap = 0.5
+    assert rag.adaptive_depth and rag.fetch_k == 10
+    rag.depth_max_k = 7
+    assert rag.fetch_k == 7
+    print("   ✓ top_k when off, 2 * top_k or depth_max_k when on")
+
+    # Test 2: cut-off by absolute distance, relative gap and min/max depth
+    print("\n2. Testing depth cut-off...")
+    docs = [{'id': f"d{i}", 'distance': distance} for i, distance in enumerate([0.2, 0.25, 0.28, 0.5, 0.9, 1.4])]
+    rag = rag_system(collection, depth_max_distance=1.0)
+    assert [doc['id'] for doc in rag._select_depth(docs)] == ['d0', 'd1', 'd2', 'd3', 'd4']
+    rag = rag_system(collection, depth_relative_gap=0.5)
+    assert [doc['id'] for doc in rag._select_depth(docs)] == ['d0', 'd1', 'd2']
+    rag = rag_system(collection, depth_relative_gap=0.1, depth_min_k=2)
+    assert [doc['id'] for doc in rag._select_depth(docs)] == ['d0', 'd1']
+    rag = rag_system(collection, depth_max_distance=10.0, depth_max_k=4)
+    assert len(rag._select_depth(docs)) == 4
+    rag = rag_system(collection, depth_max_distance=0.1)
+    assert rag._select_depth(docs) == []
+    print("   ✓ Max distance, relative gap, min_k and max_k applied in order")
+
+    # Test 3: a search with nothing close enough returns no chunks
+    print("\n3. Testing retrieval beyond max distance...")
+    rag = rag_system(collection, depth_max_distance=2.0)
+    unrelated = np.zeros(dim)
+    unrelated[1] = 5.0
+    assert rag._retrieve_documents("q", unrelated.tolist()) == []
+    assert len(rag._retrieve_documents("q", query.tolist())) >= 1
+    print("   ✓ Far query retrieves nothing, near query keeps its close chunks")
+
+    # Test 4: nDCG stays within [0, 1] when adaptive depth returns more than top_k chunks
+    print("\n4. Testing retrieval scoring with over-fetched chunks...")
+    queries_path = Path(tempfile.mkdtemp()) / "queries.jsonl"
+    queries_path.write_text(json.dumps({
+        "query": "How many vacation days do employees get?",
+        "relevant_sources": ["pto-policy.md"]
+    }) + "\n" + json.dumps({"query": "Unlabeled question"}) + "\n")
+    rag = rag_system(collection, depth_max_distance=1e6)
+    assert len(rag._retrieve_documents("q", query.tolist())) == 2 * rag.top_k
+    summary = RAGEvaluator(rag, queries_path).run_retrieval_evaluation(query_embeddings=np.array([query, query]),
+                                                                     save=False)
+    assert summary['total_queries'] == 1 and summary['skipped_unlabeled'] == 1, summary
+    assert 0.0 <= summary['ndcg_at_k'] <= 1.0 + 1e-9, summary['ndcg_at_k']
+    assert summary['recall_at_k'] == 1.0
+    print(f"   ✓ nDCG@{rag.top_k} {summary['ndcg_at_k']:.3f} from {summary['mean_retrieved_chunks']:.0f} chunks, "
+          f"unlabeled query skipped")
+
+    print("\n✓ Adaptive retrieval depth works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
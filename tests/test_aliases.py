@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Test alias activation and rollback of collection versions (runs offline, no API key needed)."""
+
+import sys
+import time
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import src.ingest as ingest
+from src.aliases import AliasRegistry, file_lock, versioned_name
+
+print("Testing Collection Aliases")
+print("=" * 50)
+
+
+def activate_version(args):
+    persist_dir, name, existing = args
+    AliasRegistry(persist_dir).activate('policies', name, existing)
+
+
+def try_lock(path):
+    with file_lock(Path(path), blocking=False) as acquired:
+        return acquired
+
+
+try:
+    persist_dir = tempfile.mkdtemp()
+    registry = AliasRegistry(persist_dir)
+
+    # Test 1: an alias without a collection of its own is not a rollback target
+    print("\n1. Testing first activation...")
+    assert registry.resolve('policies') == 'policies'
+    previous = registry.activate('policies', 'policies_v1', existing={'policies_v1'})
+    assert previous is None
+    assert registry.load()['policies']['history'] == []
+    print("   ✓ Missing 'policies' collection not kept in history")
+
+    # Test 2: activate and roll back
+    print("\n2. Testing activate and rollback...")
+    assert registry.activate('policies', 'policies_v2', existing={'policies_v1', 'policies_v2'}) == 'policies_v1'
+    assert registry.activate('policies', 'policies_v3') == 'policies_v2'
+    assert registry.resolve('policies') == 'policies_v3'
+    assert registry.rollback('policies') == 'policies_v2'
+    assert registry.rollback('policies') == 'policies_v1'
+    assert registry.resolve('policies') == 'policies_v1'
+    try:
+        registry.rollback('policies')
+        raise AssertionError("Expected ValueError with empty history")
+    except ValueError:
+        pass
+    print("   ✓ v3 -> v2 -> v1, then no further rollback")
+
+    # Test 3: forget drops deleted versions from history
+    print("\n3. Testing forget...")
+    registry.activate('policies', 'policies_v2')
+    registry.activate('policies', 'policies_v3')
+    registry.forget('policies', ['policies_v1'])
+    assert registry.load()['policies']['history'] == ['policies_v2']
+    print("   ✓ Deleted version removed from history")
+
+    # Test 4: concurrent activations from several processes lose no update
+    print("\n4. Testing concurrent activations...")
+    names = [f"policies_c{i}" for i in range(12)]
+    with multiprocessing.Pool(6) as pool:
+        pool.map(activate_version, [(persist_dir, name, None) for name in names])
+    entry = AliasRegistry(persist_dir).load()['policies']
+    assert sorted(entry['history'][2:] + [entry['current']]) == sorted(names), entry
+    print(f"   ✓ All {len(names)} activations recorded")
+
+    # Test 5: a held lock makes non-blocking attempts fail
+    print("\n5. Testing registry lock...")
+    with file_lock(registry.lock_path) as held:
+        assert held
+        with multiprocessing.Pool(1) as pool:
+            assert pool.apply(try_lock, (str(registry.lock_path),)) is False
+    with multiprocessing.Pool(1) as pool:
+        assert pool.apply(try_lock, (str(registry.lock_path),)) is True
+    print("   ✓ Lock excludes other processes while held")
+
+    # Test 6: identical builds get distinct versions and never write into an existing one
+    print("\n6. Testing version names...")
+    params = {'chunk_size': 500, 'overlap': 50}
+    names = []
+    for _ in range(5):
+        names.append(versioned_name('policies', params))
+        time.sleep(0.001)
+    assert len(set(names)) == 5 and sorted(names) == names, names
+    chunks = [{'id': f"doc_{i}", 'text': f"Policy text {i}", 'source_id': 'doc.md', 'title': 'doc.md',
+               'chunk_id': i, 'file_type': 'md'} for i in range(2)]
+    embeddings = [[1.0, 0.0], [0.0, 1.0]]
+    name = ingest.store_version(persist_dir, 'policies', chunks, embeddings, params, activate=False)
+    ingest.versioned_name = lambda alias, params: name
+    try:
+        ingest.store_version(persist_dir, 'policies', chunks, embeddings, params, activate=False)
+        raise AssertionError("store_version wrote into an existing collection")
+    except Exception as e:
+        assert 'already exists' in str(e), e
+    assert ingest.ChromaDBManager(persist_dir, name).get_collection_stats()['total_chunks'] == 2
+    print("   ✓ Builds within a second get distinct, ordered names; storing under a taken name fails")
+
+    print("\n✓ Collection aliases work!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Test micro-batching of query embeddings (runs offline, no API key needed)."""
+
+import sys
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from src.batching import BatchingEncoder
+
+print("Testing Query Embedding Batching")
+print("=" * 50)
+
+
+class RecordingModel:
+    """Stand-in for a SentenceTransformer: "q<i>" encodes to [i, i]; records every batch."""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def encode(self, texts, batch_size=32):
+        with self._lock:
+            self.batches.append(list(texts))
+        # Requests keep arriving while a batch is being encoded
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model failure")
+        return np.array([[float(text[1:])] * 2 for text in texts])
+
+
+try:
+    # Test 1: concurrent queries are coalesced into few batches
+    print("\n1. Testing batch coalescing...")
+    model = RecordingModel()
+    encoder = BatchingEncoder(model, max_batch_size=8, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=24) as executor:
+        vectors = list(executor.map(lambda i: encoder.encode(f"q{i}"), range(24)))
+    assert len(model.batches) < 24 / 2, model.batches
+    assert max(len(batch) for batch in model.batches) <= 8
+    assert sorted(text for batch in model.batches for text in batch) == sorted(f"q{i}" for i in range(24))
+    print(f"   ✓ 24 queries encoded in {len(model.batches)} batches of at most 8")
+
+    # Test 2: every caller gets the vector of its own query
+    print("\n2. Testing result scatter...")
+    for i, vector in enumerate(vectors):
+        assert np.array_equal(vector, [i, i]), (i, vector)
+    print("   ✓ Each caller received its own embedding")
+
+    # Test 3: a lone query is not held longer than the batching window
+    print("\n3. Testing batching window...")
+    model.delay = 0.0
+    start = time.perf_counter()
+    assert np.array_equal(encoder.encode("q7"), [7, 7])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    assert elapsed_ms < 20 + 50, elapsed_ms
+    print(f"   ✓ Single query answered in {elapsed_ms:.1f}ms")
+
+    # Test 4: a failed batch fails every caller in it
+    print("\n4. Testing batch failure...")
+    failing = BatchingEncoder(RecordingModel(fail=True), max_batch_size=8, max_wait_ms=20)
+
+    def encode_or_error(i):
+        try:
+            failing.encode(f"q{i}")
+            return None
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        errors = list(executor.map(encode_or_error, range(4)))
+    assert errors == ["model failure"] * 4, errors
+    print("   ✓ All 4 callers received the model error")
+
+    print("\n✓ Query embedding batching works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Test answer/embedding caches and cache warm-up (runs offline, no API key needed)."""
+
+import sys
+import json
+import time
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from rag_fixtures import ephemeral_collection, rag_system
+from src.cache import LRUCache, normalize_question
+from src.warmup import CacheWarmer
+from src.aliases import file_lock
+
+print("Testing Caches and Warm-up")
+print("=" * 50)
+
+
+class HashEmbedder:
+    """Deterministic stand-in for the SentenceTransformer; counts encoded texts."""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        return np.array([np.random.default_rng(abs(hash(text)) % 2 ** 32).normal(size=8) for text in texts])
+
+
+def hold_lock(path, seconds):
+    with file_lock(Path(path)):
+        time.sleep(seconds)
+
+
+try:
+    rng = np.random.default_rng(5)
+
+    # Test 1: LRU eviction, lifetime and normalized keys
+    print("\n1. Testing LRU cache...")
+    cache = LRUCache('test', max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 1
+    short = LRUCache('short', ttl_seconds=0.05)
+    short.put('k', 'v')
+    time.sleep(0.1)
+    assert short.get('k') is None and 'k' not in short
+    assert normalize_question("  How many PTO days?") == normalize_question("how many pto  days")
+    print("   ✓ Eviction, expiry and question normalization")
+
+    # Test 2: a collection swap invalidates cached answers
+    print("\n2. Testing cache invalidation on swap...")
+    old = ephemeral_collection('cache_old', ['a1', 'a2'], rng.normal(size=(2, 8)),
+                               [{'source_id': 'a.md', 'title': 'a.md', 'chunk_id': i} for i in range(2)])
+    new = ephemeral_collection('cache_new', ['b1', 'b2'], rng.normal(size=(2, 8)),
+                               [{'source_id': 'b.md', 'title': 'b.md', 'chunk_id': i} for i in range(2)])
+    rag = rag_system(old, answer_cache_size=10)
+    key = normalize_question("How many PTO days?")
+    rag._cache_answer(key, {'answer': 'old answer', 'timings_ms': {}}, old)
+    assert rag.answer_cache.get(key) == {'answer': 'old answer'}
+    rag.use_collection(new)
+    assert rag.collection is new
+    assert key not in rag.answer_cache
+    # An answer computed on the old collection that finishes after the swap is not cached
+    rag._cache_answer(key, {'answer': 'stale answer'}, old)
+    assert key not in rag.answer_cache
+    rag._cache_answer(key, {'answer': 'new answer'}, new)
+    assert rag.answer_cache.get(key) == {'answer': 'new answer'}
+    print("   ✓ Swap clears answers; stale in-flight answers are dropped")
+
+    # Test 3: a query answered while the collection is swapped is returned but not cached
+    print("\n3. Testing swap during a query...")
+    embedder = HashEmbedder()
+    rag = rag_system(old, answer_cache_size=10)
+    rag.embedder = embedder
+    question = "What is the expense limit?"
+
+    def answer_during_swap(q, docs, timings):
+        rag.use_collection(new)
+        return "answer from the old collection"
+
+    rag._generate_response = answer_during_swap
+    result = rag.query(question)
+    assert result['answer'] == "answer from the old collection" and 'error' not in result, result
+    assert rag.collection is new and normalize_question(question) not in rag.answer_cache
+    rag._generate_response = lambda q, docs, timings: "answer from the new collection"
+    assert rag.query(question)['answer'] == "answer from the new collection"
+    cached = rag.query(question)
+    assert cached['cached'] and cached['answer'] == "answer from the new collection"
+    print("   ✓ In-flight answer returned uncached; the next answer is cached")
+
+    # Test 4: a failed search returns the error answer and is not cached
+    print("\n4. Testing retrieval errors...")
+    rag = rag_system(old, answer_cache_size=10)
+    rag.embedder = embedder
+
+    def search_unavailable(query_embedding, where, collection):
+        raise ConnectionError("Chroma unavailable")
+
+    rag._search = search_unavailable
+    result = rag.query(question)
+    assert result['error'] == 'ConnectionError' and result['retrieved_chunks'] == 0, result
+    assert normalize_question(question) not in rag.answer_cache
+    print("   ✓ Error answer with error=ConnectionError, nothing cached")
+
+    # Test 5: warm-up answers are generated once and shared with the other workers
+    print("\n5. Testing warm-up...")
+    log_path = Path(tempfile.mkdtemp()) / "queries.jsonl"
+    questions = ["How many PTO days?", "how many pto days", "What is the expense limit?", "Can I work remotely?"]
+    log_path.write_text(''.join(json.dumps({'question': q}) + '\n' for q in questions))
+    lock_path = log_path.parent / "warmup.lock"
+    llm_calls = []
+
+    def worker(collection, **caches):
+        """A worker's RAGSystem and warmer; answers are counted as LLM calls."""
+        rag = rag_system(collection, **caches)
+        rag.embedder = HashEmbedder()
+        rag._generate_response = lambda q, docs, timings: llm_calls.append(q) or f"Answer to {q}"
+        return rag, CacheWarmer(rag, str(log_path), top_n=10, rate_per_minute=0, lock_path=lock_path)
+
+    first, warmer = worker(new, answer_cache_size=10)
+    report = warmer.run()
+    assert report['mode'] == 'answers' and report['warmed'] == 3 and report['loaded'] == 0, report
+    assert len(llm_calls) == 3
+    print("   ✓ First worker: 3 questions answered (duplicate spelling merged)")
+
+    second, warmer = worker(new, answer_cache_size=10)
+    holder = multiprocessing.Process(target=hold_lock, args=(str(lock_path), 1.0))
+    holder.start()
+    time.sleep(0.3)
+    started = time.perf_counter()
+    report = warmer.run()
+    holder.join()
+    assert time.perf_counter() - started > 0.5, "warm-up did not wait for the lock"
+    assert report['loaded'] == 3 and report['warmed'] == 0 and len(llm_calls) == 3, report
+    result = second.query("Can I work remotely?")
+    assert result['cached'] and result['answer'] == "Answer to Can I work remotely?", result
+    assert warmer.run()['cached'] == 3
+    print("   ✓ Second worker: waited for the lock, loaded 3 answers, no LLM calls")
+
+    third, warmer = worker(old, answer_cache_size=10)
+    report = warmer.run()
+    assert report['warmed'] == 3 and len(llm_calls) == 6, report
+    print("   ✓ Answers shared for another collection are not reused")
+
+    embeddings_only, warmer = worker(new, embedding_cache_size=10)
+    report = warmer.run()
+    assert report['mode'] == 'embeddings' and report['warmed'] == 3, report
+    assert embeddings_only.embedder.encoded == 3 and len(llm_calls) == 6
+    print("   ✓ Without an answer cache: 3 embeddings warmed, no LLM calls")
+
+    print("\n✓ Caches and warm-up work!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Test LLM response record/replay (runs offline, no API key needed)."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+from src.cassette import LLMCassette, CassetteMiss
+from src.fake_openrouter import FakeLLMBehavior, start_in_thread
+
+print("Testing LLM Cassette")
+print("=" * 50)
+
+prompt = "Document 1:\nSource: Pto Policy (from policies/pto-policy.md)\nEmployees accrue 15 days per year.\n"
+data = {
+    "model": "fake/local-model:free",
+    "messages": [{"role": "user", "content": prompt}],
+    "max_tokens": 50,
+    "temperature": 0.1
+}
+
+try:
+    directory = tempfile.mkdtemp()
+
+    # Test 1: Keys depend on model, prompt and params
+    print("\n1. Testing request keys...")
+    assert LLMCassette.key(data) == LLMCassette.key(dict(data))
+    assert LLMCassette.key(data) != LLMCassette.key({**data, "temperature": 0.7})
+    assert LLMCassette.key(data) != LLMCassette.key({**data, "model": "other/model"})
+    assert LLMCassette.key(data) != LLMCassette.key({**data, "messages": [{"role": "user", "content": "Hi"}]})
+    print("   ✓ Keys are stable and distinguish requests")
+
+    # Test 2: Record a response from the fake server
+    print("\n2. Testing record mode...")
+    server, base_url = start_in_thread(FakeLLMBehavior(latency_ms=0, seed=1))
+    recorder = LLMCassette(directory, mode="record")
+    assert recorder.lookup(data) is None
+    response = requests.post(f"{base_url}/chat/completions", json=data, timeout=10).json()
+    recorder.record(data, response)
+    server.shutdown()
+    print(f"   ✓ Recorded {len(list(Path(directory).glob('*.json')))} response")
+
+    # Test 3: Replay without the server
+    print("\n3. Testing replay mode...")
+    player = LLMCassette(directory, mode="replay")
+    assert player.lookup(data) == response
+    try:
+        player.lookup({**data, "max_tokens": 10})
+        raise AssertionError("Expected CassetteMiss for an unrecorded request")
+    except CassetteMiss:
+        pass
+    print("   ✓ Replayed recording, unrecorded request raised CassetteMiss")
+
+    # Test 4: Auto mode falls through on a miss
+    print("\n4. Testing auto mode...")
+    auto = LLMCassette(directory, mode="auto")
+    assert auto.lookup(data) == response
+    assert auto.lookup({**data, "max_tokens": 10}) is None
+    print("   ✓ Hits replayed, misses go to the network")
+
+    print("\n✓ LLM cassette works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
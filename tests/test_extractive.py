@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Test extractive answers on the confident and fallback paths (runs offline, no API key needed)."""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from rag_fixtures import ephemeral_collection, rag_system
+from src.extractive import split_sentences
+
+print("Testing Extractive Answers")
+print("=" * 50)
+
+VOCABULARY = ['vacation', 'days', 'employees', 'expense', 'receipts', 'remote', 'security', 'password']
+
+
+class KeywordEmbedder:
+    """Stand-in for the SentenceTransformer: normalized keyword counts, so similarity is predictable."""
+
+    def encode(self, texts, **kwargs):
+        vectors = np.array([[text.lower().count(word) for word in VOCABULARY] for text in texts], dtype=float)
+        vectors += 0.01
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+CHUNKS = {
+    'pto-policy.md': "# Vacation\n- Employees get 20 vacation days per year. Unused days carry over up to 5 days. "
+                     "Requests go through the HR portal two weeks ahead.",
+    'expense-policy.md': "Submit expense reports with receipts within 30 days. Expenses above $500 need approval.",
+    'security-policy.md': "Passwords must be rotated every 90 days. The security team reviews remote access yearly."
+}
+
+
+def llm_unavailable(question, docs, timings):
+    raise ConnectionError("LLM unavailable")
+
+
+try:
+    embedder = KeywordEmbedder()
+    names = list(CHUNKS)
+    collection = ephemeral_collection(
+        'extractive_chunks', [f"chunk_{i}" for i in range(len(names))], embedder.encode(list(CHUNKS.values())),
+        [{'source_id': f"policies/{name}", 'title': name, 'chunk_id': 0} for name in names],
+        documents=list(CHUNKS.values())
+    )
+    question = "How many vacation days do employees get?"
+
+    def keyword_rag(**settings):
+        """System over the policy chunks whose query and sentence embeddings come from the keyword embedder."""
+        rag = rag_system(collection, top_k=2, **settings)
+        rag.embedder = rag.extractive.embedder = embedder
+        return rag
+
+    # Test 1: sentences are split without markdown markup
+    print("\n1. Testing sentence splitting...")
+    sentences = split_sentences(CHUNKS['pto-policy.md'])
+    assert sentences[0] == "Employees get 20 vacation days per year.", sentences
+    assert all(not s.startswith(('#', '-')) for s in sentences)
+    print(f"   ✓ {len(sentences)} sentences from the PTO chunk")
+
+    # Test 2: confident retrieval answers extractively without calling the LLM
+    print("\n2. Testing confident extractive path...")
+    llm_calls = []
+    rag = keyword_rag(extractive_max_distance=0.5, extractive_sentences=1)
+    rag.extractive.min_similarity = 0.5
+    rag._generate_response = lambda q, docs, timings: llm_calls.append(q) or "LLM answer"
+    result = rag.query(question)
+    assert llm_calls == [], llm_calls
+    assert result['answer_mode'] == 'extractive' and 'error' not in result
+    assert result['answer'] == "Employees get 20 vacation days per year. [Source: pto-policy.md]", result['answer']
+    assert 'extractive' in result['timings_ms'] and 'llm' not in result['timings_ms']
+    print(f"   ✓ {result['answer']}")
+
+    # Test 3: retrieval that is not confident enough goes to the LLM
+    print("\n3. Testing LLM path below the confidence threshold...")
+    rag.extractive_max_distance = 1e-6
+    result = rag.query(question)
+    assert llm_calls == [question] and result['answer'] == "LLM answer" and 'answer_mode' not in result
+    print("   ✓ Best distance above the threshold, LLM answered")
+
+    # Test 4: when no sentence is similar enough the LLM still answers
+    print("\n4. Testing confident retrieval without a matching sentence...")
+    rag.extractive_max_distance = 10.0
+    # Cosine similarity never exceeds 1
+    rag.extractive.min_similarity = 1.01
+    result = rag.query(question)
+    assert len(llm_calls) == 2 and result['answer'] == "LLM answer"
+    print("   ✓ No sentence above min_similarity, LLM answered")
+
+    # Test 5: LLM failure falls back to an extractive answer, still flagged as an error
+    print("\n5. Testing degraded-mode fallback...")
+    rag = keyword_rag(extractive_fallback=True, extractive_sentences=2)
+    rag._generate_response = llm_unavailable
+    result = rag.query(question)
+    assert result['answer_mode'] == 'extractive' and result['error'] == 'ConnectionError'
+    assert result['answer'].startswith("Employees get 20 vacation days per year. [Source: pto-policy.md]")
+    print("   ✓ Extractive answer with error=ConnectionError")
+
+    print("\n✓ Extractive answers work!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
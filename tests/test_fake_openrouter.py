@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Test the local fake OpenRouter server (runs offline, no API key needed)."""
+
+import sys
+import json
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+from src.fake_openrouter import FakeLLMBehavior, start_in_thread
+
+print("Testing Fake OpenRouter Server")
+print("=" * 50)
+
+prompt = "Document 1:\nSource: Pto Policy (from policies/pto-policy.md)\nEmployees accrue 15 days per year.\n"
+data = {
+    "model": "fake/local-model:free",
+    "messages": [{"role": "user", "content": prompt}],
+    "max_tokens": 50
+}
+
+try:
+    # Test 1: Non-streaming completion
+    print("\n1. Testing chat completion...")
+    server, base_url = start_in_thread(FakeLLMBehavior(latency_ms=10, tokens_per_second=1000, seed=1))
+    response = requests.post(f"{base_url}/chat/completions", json=data, timeout=10)
+    assert response.status_code == 200, response.text
+    answer = response.json()['choices'][0]['message']['content']
+    assert "[Source: pto-policy.md]" in answer, answer
+    print(f"   ✓ Response: {answer}")
+
+    # Test 2: Streaming completion
+    print("\n2. Testing streaming completion...")
+    response = requests.post(f"{base_url}/chat/completions", json={**data, "stream": True}, stream=True, timeout=10)
+    events = [line[6:] for line in response.iter_lines(decode_unicode=True) if line.startswith("data: ")]
+    assert events[-1] == "[DONE]", events[-1]
+    streamed = "".join(
+        json.loads(event)['choices'][0]['delta'].get('content', '') for event in events[:-1]
+    )
+    assert streamed.strip() == answer, streamed
+    print(f"   ✓ Received {len(events) - 1} chunks")
+    server.shutdown()
+
+    # Test 3: 429 injection
+    print("\n3. Testing rate limit injection...")
+    server, base_url = start_in_thread(FakeLLMBehavior(latency_ms=0, rate_limit_probability=1.0))
+    response = requests.post(f"{base_url}/chat/completions", json=data, timeout=10)
+    assert response.status_code == 429, response.status_code
+    assert response.headers.get('Retry-After'), "Missing Retry-After header"
+    print("   ✓ Received 429 with Retry-After")
+    server.shutdown()
+
+    print("\n✓ Fake OpenRouter server works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -15,8 +15,10 @@ load_dotenv()
 
 api_key = os.getenv("OPENROUTER_API_KEY")
 model = os.getenv("OPENROUTER_MODEL", "microsoft/phi-3-mini-128k-instruct:free")
+base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 print(f"Testing OpenRouter API...")
+print(f"Endpoint: {base_url}")
 print(f"Model: {model}")
 print(f"API Key: {api_key[:10]}..." if api_key else "No API key found")
 print()
@@ -40,7 +42,7 @@ data = {
 try:
     print("Sending test request to OpenRouter...")
     response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
+        f"{base_url.rstrip('/')}/chat/completions",
         headers=headers,
         json=data,
         timeout=30
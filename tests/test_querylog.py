@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Test the structured query log: rotation, dropped records and analysis (runs offline, no API key needed)."""
+
+import sys
+import time
+import json
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.querylog import QueryLog, DROPPED, query_record, read_records, analyze
+
+print("Testing Query Log")
+print("=" * 50)
+
+
+def record(i: int, cache: str = 'miss') -> dict:
+    result = {'answer': 'ok', 'cached': cache == 'hit'}
+    retrieved = [{'id': f"chunk_{i}", 'distance': 0.25}]
+    return query_record(f"Question number {i}?", result, {'embed': 2.0, 'llm': 100.0 + i}, retrieved,
+                        'test-model', 120.0 + i, cache_enabled=True)
+
+
+def write_records(path: str, start: int):
+    log = QueryLog(path, max_bytes=4000, backups=100, batch_size=5, flush_interval=0.01)
+    for i in range(start, start + 100):
+        log.record(record(i))
+        time.sleep(0.001)
+    log.close()
+
+
+try:
+    # Test 1: the log rotates by size and keeps the configured number of backups
+    print("\n1. Testing rotation...")
+    log_dir = Path(tempfile.mkdtemp())
+    path = log_dir / "queries.jsonl"
+    log = QueryLog(str(path), max_bytes=4000, backups=2, batch_size=10, flush_interval=0.05)
+    for i in range(200):
+        log.record(record(i))
+    log.close()
+    files = sorted(p.name for p in log_dir.iterdir())
+    assert files == ['queries.jsonl', 'queries.jsonl.1', 'queries.jsonl.2', 'queries.jsonl.lock'], files
+    assert all((log_dir / name).stat().st_size <= 4000 for name in files)
+    records = read_records(str(path))
+    numbers = [int(r['question'].split()[2].rstrip('?')) for r in records]
+    assert numbers == list(range(200 - len(records), 200)), numbers[:5]
+    print(f"   ✓ 3 files of at most 4000 bytes holding the newest {len(records)} of 200 records")
+
+    # Test 2: workers sharing the file rotate it once per overflow and lose no record
+    print("\n2. Testing rotation across processes...")
+    shared = Path(tempfile.mkdtemp()) / "queries.jsonl"
+    writers = [multiprocessing.Process(target=write_records, args=(str(shared), 1000 * n)) for n in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    numbers = [int(r['question'].split()[2].rstrip('?')) for r in read_records(str(shared))]
+    assert sorted(numbers) == [1000 * n + i for n in range(4) for i in range(100)], len(numbers)
+    assert all(p.stat().st_size <= 4000 for p in shared.parent.iterdir())
+    print(f"   ✓ 4 processes, {len(numbers)} records across {len(list(shared.parent.iterdir())) - 1} files")
+
+    # Test 3: records that do not fit the queue are dropped and counted, never blocking
+    print("\n3. Testing dropped records...")
+    slow_path = Path(tempfile.mkdtemp()) / "queries.jsonl"
+    slow = QueryLog(str(slow_path), max_queue=5, flush_interval=0.05)
+    release = threading.Event()
+    write = slow._write
+    slow._write = lambda batch: (release.wait(5), write(batch))
+    dropped_before = DROPPED.value()
+    start = time.perf_counter()
+    for i in range(50):
+        slow.record(record(i))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    dropped = DROPPED.value() - dropped_before
+    release.set()
+    slow.close()
+    written = len(read_records(str(slow_path)))
+    assert dropped >= 50 - 5 - slow.batch_size, dropped
+    assert written + dropped == 50, (written, dropped)
+    assert elapsed_ms < 100, elapsed_ms
+    print(f"   ✓ {int(dropped)} dropped, {written} written, 50 records queued in {elapsed_ms:.1f}ms")
+
+    # Test 4: unreadable lines are skipped and the analysis reports cache hits and latency
+    print("\n4. Testing analysis...")
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"truncated\n')
+        f.write(json.dumps(record(199, cache="hit")) + '\n')
+    records = read_records(str(path))
+    summary = analyze(records, top=3)
+    assert summary['queries'] == len(records)
+    assert summary['top_questions'][0]['question'] == "Question number 199?"
+    assert summary['top_questions'][0]['count'] == 2
+    assert 0 < summary['cache_hit_ratio'] < 1
+    assert set(summary['stage_latency_ms']) == {'embed', 'llm'}
+    print(f"   ✓ Hit ratio {summary['cache_hit_ratio']:.3f}, p95 {summary['latency_ms']['p95']:.1f}ms")
+
+    print("\n✓ Query log works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
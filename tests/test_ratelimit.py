@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test the shared OpenRouter token bucket (runs offline, no API key needed)."""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ratelimit import TokenBucket, RateLimitTimeout, bucket_name
+
+print("Testing OpenRouter Rate Limiting")
+print("=" * 50)
+
+db_path = str(Path(tempfile.mkdtemp()) / "rate_limit.sqlite3")
+
+try:
+    # Test 1: burst tokens are immediate, later ones are spaced by the interval
+    print("\n1. Testing GCRA token timing...")
+    bucket = TokenBucket(name="timing", rate_per_minute=600, burst=3, db_path=db_path)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0], waits
+    # 600/min is one token per 0.1s; the 4th and 5th wait one interval each after the burst
+    assert 0.05 < waits[3] <= 0.1 + 0.02, waits
+    assert 0.05 < waits[4] <= 0.1 + 0.02, waits
+    print(f"   ✓ Burst of 3 immediate, then waits {waits[3]:.3f}s, {waits[4]:.3f}s")
+
+    # Test 2: a second process view of the same file shares the schedule
+    print("\n2. Testing shared budget...")
+    same = TokenBucket(name="timing", rate_per_minute=600, burst=3, db_path=db_path)
+    assert same.acquire() > 0.05
+    other = TokenBucket(name="other", rate_per_minute=600, burst=3, db_path=db_path)
+    assert other.acquire() == 0.0
+    print("   ✓ Same name shares the schedule, other names do not")
+
+    # Test 3: timeouts fail fast without consuming a token
+    print("\n3. Testing timeout...")
+    slow = TokenBucket(name="slow", rate_per_minute=6, burst=1, db_path=db_path)
+    slow.acquire()
+    start = time.time()
+    try:
+        slow.acquire(timeout=0.5)
+        raise AssertionError("Expected RateLimitTimeout")
+    except RateLimitTimeout:
+        pass
+    assert time.time() - start < 0.5
+    print("   ✓ RateLimitTimeout raised immediately")
+
+    # Test 4: penalize pushes the schedule past Retry-After
+    print("\n4. Testing penalize...")
+    penalized = TokenBucket(name="penalized", rate_per_minute=600, burst=2, db_path=db_path)
+    penalized.penalize(0.3)
+    wait = penalized.acquire()
+    assert 0.25 < wait <= 0.35, wait
+    print(f"   ✓ Next token after {wait:.3f}s")
+
+    # Test 5: opt-in, one bucket per base URL
+    print("\n5. Testing environment configuration...")
+    os.environ.pop("OPENROUTER_RATE_LIMIT_RPM", None)
+    assert TokenBucket.from_env() is None
+    os.environ["OPENROUTER_RATE_LIMIT_RPM"] = "30"
+    os.environ["OPENROUTER_RATE_LIMIT_DB"] = db_path
+    local = TokenBucket.from_env("http://127.0.0.1:8001/api/v1/")
+    remote = TokenBucket.from_env("https://openrouter.ai/api/v1")
+    assert local.name == bucket_name("http://127.0.0.1:8001/api/v1") != remote.name
+    assert local.rate_per_minute == 30
+    print(f"   ✓ Off by default; buckets {local.name} and {remote.name}")
+
+    print("\n✓ Rate limiting works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
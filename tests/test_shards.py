@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Test sharded retrieval over several collections (runs offline, no API key needed)."""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from rag_fixtures import ephemeral_collection
+from src.shards import ShardedCollection
+
+print("Testing Sharded Retrieval")
+print("=" * 50)
+
+rng = np.random.default_rng(7)
+dim = 16
+embeddings = rng.normal(size=(30, dim))
+sources = [f"dept{i % 3}/policy{i % 6}.md" for i in range(30)]
+metadatas = [{'source_id': source, 'chunk_id': i} for i, source in enumerate(sources)]
+ids = [f"chunk_{i}" for i in range(30)]
+
+try:
+    # Reference: one collection holding everything; shards split the same chunks by department
+    single = ephemeral_collection('shards_single', ids, embeddings, metadatas)
+    shards = []
+    for shard in range(3):
+        rows = [i for i in range(30) if sources[i].startswith(f"dept{shard}/")]
+        shards.append(ephemeral_collection(f"shards_part{shard}", [ids[i] for i in rows], embeddings[rows],
+                                           [metadatas[i] for i in rows]))
+    sharded = ShardedCollection(shards)
+
+    # Test 1: merged ranking equals the ranking of the unsharded collection
+    print("\n1. Testing merged shard ranking...")
+    queries = rng.normal(size=(4, dim)).tolist()
+    expected = single.query(query_embeddings=queries, n_results=5, include=['distances', 'metadatas'])
+    merged = sharded.query(query_embeddings=queries, n_results=5, include=['distances', 'metadatas'])
+    assert merged['ids'] == expected['ids'], (merged['ids'], expected['ids'])
+    assert np.allclose(merged['distances'], expected['distances'], atol=1e-4)
+    assert sorted(merged.keys()) == ['distances', 'ids', 'metadatas']
+    assert sharded.count() == 30
+    print("   ✓ Global top-5 matches the unsharded collection for 4 queries")
+
+    # Test 2: a source filter only searches the shards holding that source
+    print("\n2. Testing source-filtered shard selection...")
+    where = {'source_id': {'$in': ['dept1/policy1.md', 'dept1/policy4.md']}}
+    assert sharded._shards_for(where) == [shards[1]]
+    filtered = sharded.query(query_embeddings=queries[:1], n_results=3, where=where)
+    assert all(m['source_id'].startswith('dept1/') for m in filtered['metadatas'][0])
+    print("   ✓ Filtered query went to 1 of 3 shards")
+
+    # Test 3: views replaced on every swap share one thread pool
+    print("\n3. Testing shared thread pool...")
+    for _ in range(20):
+        ShardedCollection(shards).query(query_embeddings=queries[:1], n_results=1)
+    shard_threads = [t for t in threading.enumerate() if t.name.startswith('shard')]
+    views_threads = len(shard_threads)
+    for _ in range(20):
+        ShardedCollection(shards).query(query_embeddings=queries[:1], n_results=1)
+    assert len([t for t in threading.enumerate() if t.name.startswith('shard')]) == views_threads
+    print(f"   ✓ {views_threads} shard threads after 40 views")
+
+    print("\n✓ Sharded retrieval works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Test small-to-big (parent/child) chunking and retrieval (runs offline, no API key needed)."""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from rag_fixtures import ephemeral_collection, rag_system
+from src.ingest import ParentChildChunker, embed_parents
+
+print("Testing Small-to-Big Retrieval")
+print("=" * 50)
+
+try:
+    # Test 1: every child passage belongs to, and is taken from, one parent section
+    print("\n1. Testing parent/child chunking...")
+    document = {
+        'content': ' '.join(f"Sentence {i} of the leave policy describes rule number {i} in detail." for i in range(60)),
+        'source_id': 'policies/pto-policy.md', 'title': 'PTO Policy', 'file_type': 'markdown'
+    }
+    chunker = ParentChildChunker(parent_size=1000, parent_overlap=200, child_size=250, child_overlap=50)
+    parents, children = chunker.chunk_document(document)
+    parent_text = {parent['id']: parent['text'] for parent in parents}
+    assert len(parents) > 1 and len(children) > 2 * len(parents)
+    assert len({child['id'] for child in children}) == len(children)
+    for child in children:
+        assert child['parent_id'] in parent_text
+        assert child['text'].rstrip('.') in parent_text[child['parent_id']]
+    print(f"   ✓ {len(children)} children in {len(parents)} parents")
+
+    # Test 2: parent embeddings are the normalized mean of their children's
+    print("\n2. Testing parent embeddings...")
+    rng = np.random.default_rng(11)
+    child_embeddings = rng.normal(size=(len(children), 8)).tolist()
+    parent_embeddings = embed_parents(parents, children, child_embeddings)
+    first = [e for child, e in zip(children, child_embeddings) if child['parent_id'] == parents[0]['id']]
+    mean = np.mean(first, axis=0)
+    assert np.allclose(parent_embeddings[0], mean / np.linalg.norm(mean))
+    print("   ✓ Normalized mean of child embeddings")
+
+    # Test 3: child hits expand to their parents, deduplicated and within the context budget
+    print("\n3. Testing child -> parent expansion...")
+    axis = np.eye(8)
+    child_rows = [('p0_c0', 'p0', 0.1), ('p0_c1', 'p0', 0.2), ('p1_c0', 'p1', 0.3), ('p2_c0', 'p2', 0.4)]
+    child_collection = ephemeral_collection(
+        'stb_children', [row[0] for row in child_rows], [axis[0] + offset * axis[1] for *_, offset in child_rows],
+        [{'source_id': 'pto-policy.md', 'parent_id': parent} for _, parent, _ in child_rows],
+        documents=[f"Passage {row[0]} about leave." for row in child_rows]
+    )
+    parent_collection = ephemeral_collection(
+        'stb_parents', ['p0', 'p1', 'p2'], [axis[0]] * 3, [{'source_id': 'pto-policy.md'}] * 3,
+        documents=[f"Section {i}. " + 'x' * 400 for i in range(3)]
+    )
+    rag = rag_system(child_collection, parents=parent_collection, top_k=4, context_budget_chars=900)
+    assert rag.collection is child_collection and rag.parents is parent_collection
+    docs = rag._retrieve_documents("How much leave?", axis[0].tolist())
+    assert [doc['id'] for doc in docs] == ['p0', 'p1', 'p2_c0'], [doc['id'] for doc in docs]
+    assert docs[0]['child_hits'] == 2 and docs[0]['text'].startswith('Section 0')
+    assert docs[0]['distance'] < docs[1]['distance'] < docs[2]['distance']
+    print("   ✓ Two hits share p0, p1 follows, p2 over budget falls back to its passage")
+
+    # Test 4: the best parent is kept even when it alone exceeds the budget
+    print("\n4. Testing oversized best parent...")
+    rag.context_budget_chars = 100
+    docs = rag._retrieve_documents("How much leave?", axis[0].tolist())
+    assert docs[0]['id'] == 'p0' and all(doc['id'].endswith('_c0') for doc in docs[1:])
+    print(f"   ✓ Kept p0 ({len(docs[0]['text'])} chars) over a 100-char budget")
+
+    print("\n✓ Small-to-big retrieval works!")
+
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test single-file index snapshots against Chroma (runs offline, no API key needed)."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+from src.snapshot import SnapshotIndex, SnapshotError, export_snapshot, read_header
+
+print("Testing Index Snapshots")
+print("=" * 50)
+
+rng = np.random.default_rng(7)
+sources = ['policies/pto-policy.md', 'policies/expense-policy.md', 'policies/security-policy.md']
+count, dim = 60, 32
+embeddings = rng.normal(size=(count, dim)).astype(np.float32)
+queries = rng.normal(size=(5, dim)).astype(np.float32)
+
+try:
+    directory = Path(tempfile.mkdtemp())
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+
+    for space in ('l2', 'cosine'):
+        collection = client.create_collection(name=f"snapshot_{space}", metadata={"hnsw:space": space})
+        collection.add(
+            ids=[f"chunk_{i}" for i in range(count)],
+            documents=[f"Text of chunk {i}" for i in range(count)],
+            embeddings=embeddings.tolist(),
+            metadatas=[{'source_id': sources[i % 3], 'chunk_id': i} for i in range(count)]
+        )
+
+        # Test 1: Export and header
+        print(f"\n1. Testing export ({space})...")
+        path = directory / f"{space}.snapshot"
+        export_snapshot(collection, str(path))
+        header = read_header(str(path))
+        assert header['count'] == count and header['dim'] == dim and header['space'] == space
+        assert header['matrix_offset'] % 64 == 0
+        print(f"   ✓ Wrote {path.stat().st_size} bytes")
+
+        # Test 2: Same neighbours and distances as Chroma, with and without filters
+        print(f"\n2. Testing query parity ({space})...")
+        index = SnapshotIndex(str(path))
+        assert index.count() == count
+        include = ['documents', 'metadatas', 'distances']
+        for where in (None, {'source_id': sources[0]}, {'source_id': {'$in': sources[1:]}}):
+            expected = collection.query(query_embeddings=queries.tolist(), n_results=5, where=where, include=include)
+            actual = index.query(query_embeddings=queries.tolist(), n_results=5, where=where, include=include)
+            assert actual['ids'] == expected['ids'], (where, actual['ids'], expected['ids'])
+            assert actual['documents'] == expected['documents']
+            assert np.allclose(actual['distances'], expected['distances'], atol=1e-3)
+        print("   ✓ Results match Chroma")
+
+    # Test 3: get() mirrors the collection API
+    print("\n3. Testing get...")
+    data = index.get(include=['embeddings', 'metadatas'])
+    assert np.array_equal(data['embeddings'], collection.get(include=['embeddings'])['embeddings'])
+    assert len(data['metadatas']) == count
+    assert index.get(ids=['chunk_3', 'missing'])['documents'] == ['Text of chunk 3']
+    assert len(index.get(where={'$and': [{'source_id': sources[0]}, {'chunk_id': {'$ne': 0}}]})['ids']) == 19
+    print("   ✓ get() by ids and filters")
+
+    # Test 4: Embeddings are a read-only view of the mapping
+    print("\n4. Testing memory mapping...")
+    assert not index.embeddings.flags.writeable
+    assert not index.embeddings.flags.owndata
+    print("   ✓ Embeddings are mapped, not copied")
+
+    # Test 5: Other files are rejected
+    print("\n5. Testing invalid files...")
+    bad = directory / "bad.snapshot"
+    bad.write_bytes(b"not a snapshot at all, just some bytes")
+    try:
+        SnapshotIndex(str(bad))
+        raise AssertionError("expected SnapshotError")
+    except SnapshotError:
+        pass
+    print("   ✓ Bad magic rejected")
+
+    print("\n" + "=" * 50)
+    print("✓ All snapshot tests passed!")
+
+except AssertionError as e:
+    print(f"\n✗ Test failed: {e}")
+    sys.exit(1)
+except Exception as e:
+    print(f"\n✗ Error: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)